@@ -2,7 +2,7 @@
 Chat session management endpoints
 """
 
-from fastapi import APIRouter, HTTPException, BackgroundTasks
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Query
 from typing import List, Optional, Dict, Any
 from pydantic import BaseModel
 
@@ -251,16 +251,27 @@ async def send_chat_message_with_toggle(
         )
 
 @router.get("/chat/sessions/{session_id}/messages", response_model=ChatHistoryResponse)
-async def get_chat_messages(session_id: str):
-    """Get chat session messages"""
+async def get_chat_messages(
+    session_id: str,
+    limit: Optional[int] = Query(None, ge=0),
+    offset: int = Query(0, ge=0)
+):
+    """Get chat session messages (all of them unless a limit is given)"""
     try:
         chat_service = get_chat_service()
         messages = await chat_service.get_session_messages(session_id)
         
+        # Apply pagination
+        total_count = len(messages)
+        end = total_count if limit is None else offset + limit
+        
         return ChatHistoryResponse(
             success=True,
             message="Chat messages retrieved successfully",
-            data={"messages": messages}
+            data={
+                "messages": messages[offset:end],
+                "total_count": total_count
+            }
         )
         
     except Exception as e:
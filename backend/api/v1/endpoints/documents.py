@@ -3,6 +3,7 @@ Document management endpoints
 """
 
 from fastapi import APIRouter, HTTPException, UploadFile, File, Form, BackgroundTasks, Body
+from fastapi.responses import StreamingResponse
 from typing import List, Optional, Dict, Any
 import json
 
@@ -409,4 +410,16 @@ async def paperqa_query(group_id: str, question: str = Body(..., embed=True)):
         raise HTTPException(
             status_code=500,
             detail=f"PaperQA query failed: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+@router.post("/document-groups/{group_id}/paperqa/stream")
+async def paperqa_query_stream(group_id: str, question: str = Body(..., embed=True)):
+    """PaperQA: stream answer tokens as server-sent events, then the final linked answer"""
+    async def event_stream():
+        async for event in paperqa_service.query_documents_stream(
+            collection_name=group_id,
+            question=question
+        ):
+            yield f"data: {json.dumps(event, default=str)}\n\n"
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
\ No newline at end of file
@@ -11,9 +11,10 @@ import asyncio
 from datetime import datetime
 import os
 
+import httpx
+
 from utils.helpers import generate_id, get_timestamp, create_success_response
 from urllib.parse import urlencode
-import urllib.request as _urlreq
 from core.data_models import SemanticSearchResult, SemanticSearchResponse
 
 router = APIRouter()
@@ -28,6 +29,31 @@ DEFAULT_PRESETS_FILE = DATA_DIR / "agents_presets.defaults.json"
 # Concurrency control
 store_lock = asyncio.Lock()
 
+# Shared client for calls back into this API (semantic search tool), so they
+# reuse keep-alive connections; tests can swap in one on httpx.ASGITransport
+_internal_client: Optional[httpx.AsyncClient] = None
+
+
+def _get_internal_client() -> httpx.AsyncClient:
+    """Client for this API's own endpoints, created on first use"""
+    global _internal_client
+    if _internal_client is None:
+        base = os.getenv('API_INTERNAL_BASE', '').rstrip('/') or f"http://localhost:{os.getenv('PORT','8000')}"
+        _internal_client = httpx.AsyncClient(
+            base_url=base,
+            limits=httpx.Limits(max_keepalive_connections=8),
+            timeout=300.0
+        )
+    return _internal_client
+
+
+async def close_internal_client() -> None:
+    """Close the shared internal client (call on app shutdown)"""
+    global _internal_client
+    if _internal_client is not None:
+        await _internal_client.aclose()
+        _internal_client = None
+
 # Canonical operation names (MCP-ready)
 OP_PLANNING_EXECUTE = "idea.planning.execute"
 OP_RESEARCH_EXECUTE = "idea.research.execute"
@@ -580,19 +606,14 @@ async def execute_semantic_search_agent(mission_id: str, req: ExecuteSemanticReq
     logger.info(f"Semantic search request: mission_id={mission_id}, group_id={req.groupId}, query='{req.query}', limit={req.limit}")
 
     async def direct_search(group_id: str, query: str, limit: int) -> List[SemanticSearchResult]:
-        base = os.getenv('API_INTERNAL_BASE', '').rstrip('/') or f"http://localhost:{os.getenv('PORT','8000')}"
         path = f"/api/v1/document-groups/{group_id}/search?" + urlencode({"query": query, "limit": str(limit)})
-        url = base + path
         
-        logger.info(f"direct_search: calling {url}")
+        logger.info(f"direct_search: calling {path}")
         
-        # Use aiohttp for async HTTP calls instead of blocking urllib
-        import aiohttp
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as resp:
-                logger.info(f"direct_search: HTTP {resp.status}")
-                data = await resp.json()
-                logger.info(f"direct_search: received {len(data.get('data', {}).get('results', []))} results")
+        resp = await _get_internal_client().get(path)
+        logger.info(f"direct_search: HTTP {resp.status_code}")
+        data = resp.json()
+        logger.info(f"direct_search: received {len(data.get('data', {}).get('results', []))} results")
         
         items = data.get('data', {}).get('results', []) if isinstance(data, dict) else []
         results = []
@@ -995,8 +1016,16 @@ async def add_text_artifact(mission_id: str, req: AddTextArtifactRequest):
 
 # --- Chat history ---
 @router.get("/idea-missions/{mission_id}/chat", tags=["Chat"], summary="Get chat history")
-async def get_chat_history(mission_id: str):
+async def get_chat_history(
+    mission_id: str,
+    agentId: Optional[str] = Query(None),
+    limit: Optional[int] = Query(None, ge=0)
+):
     chat = _read_json(_chat_path(mission_id), [])
+    if agentId is not None:
+        chat = [m for m in chat if m.get("agentId") == agentId]
+    if limit is not None:
+        chat = chat[:limit]
     return create_success_response(chat, "Chat history")
 
 class AppendMessageRequest(BaseModel):
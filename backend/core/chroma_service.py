@@ -97,6 +97,11 @@ class ChromaService:
             # Collection doesn't exist
             return False
     
+    @staticmethod
+    def article_document(title: str, abstract: str) -> str:
+        """Text embedded for an article; used for both adds and updates"""
+        return f"{title} {abstract}"
+    
     def add_articles(self, collection_name: str, articles: List[Dict[str, Any]]) -> bool:
         """Add articles to a ChromaDB collection
         
@@ -107,7 +112,7 @@ class ChromaService:
             return False
         
         ids = [article["id"] for article in articles]
-        documents = [f"{article['title']} {article['abstract']}" for article in articles]
+        documents = [self.article_document(article["title"], article["abstract"]) for article in articles]
         
         # Prepare metadata - ensure all values are simple types
         metadatas = []
@@ -49,21 +49,13 @@ class CollectionsManager:
 
     def metadata_to_article(self, article_id: str, metadata: Dict[str, Any], document: str = "") -> Article:
         """Convert ChromaDB metadata to Article"""
-        # Extract title and abstract from document if not in metadata
-        if document and "title" not in metadata:
-            # Simple heuristic: first line is title, rest is abstract
-            parts = document.split(" ", 1)
-            title = parts[0] if len(parts) > 0 else "Unknown Title"
-            abstract = parts[1] if len(parts) > 1 else ""
-        else:
-            title = metadata.get("title", "Unknown Title")
-            abstract = metadata.get("abstract", "")
-
+        # Title and abstract are always stored in metadata; the document is only
+        # used for embedding and is not parsed back.
         return Article(
             id=article_id,
-            title=title,
+            title=metadata.get("title", "Unknown Title"),
             authors=metadata.get("authors", []),
-            abstract=abstract,
+            abstract=metadata.get("abstract", document),
             publication_date=metadata.get("publication_date", datetime.now().isoformat()),
             url=metadata.get("url"),
             tags=metadata.get("tags", []),
@@ -368,14 +360,13 @@ class CollectionsManager:
         if not collection:
             return False
             
-        # Update in ChromaDB
-        document = f"{article.title} {article.abstract}"
+        # Update in ChromaDB, embedding the same text as when the article was added
         metadata = self.article_to_metadata(article)
         
         success = self.chroma_service.update_article(
             collection_name=collection_name,
             article_id=article.id,
-            document=document,
+            document=self.chroma_service.article_document(article.title, article.abstract),
             metadata=metadata
         )
         
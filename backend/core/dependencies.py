@@ -5,9 +5,8 @@ Provides centralized access to services and configuration
 
 from typing import Optional, Dict, Any
 from fastapi import Depends, HTTPException, status
-from functools import lru_cache
 
-from utils.config import settings
+from utils.config import settings, get_settings
 from core.services.llm import LLMServiceFactory, BaseLLMService
 from core.services.document import DocumentService
 from core.services.chat import ChatService
@@ -46,11 +45,6 @@ def get_chat_service() -> ChatService:
     
     return _service_cache["chat_service"]
 
-@lru_cache()
-def get_settings() -> settings:
-    """Get application settings (cached)"""
-    return settings
-
 def validate_api_key(api_key: Optional[str] = None) -> bool:
     """
     Validate API key (for future use when authentication is added)
@@ -131,7 +125,18 @@ def clear_service_cache():
     """
     global _service_cache
     _service_cache.clear()
-    get_settings.cache_clear()
+    # LLM services may still be serving requests, so they are left to the
+    # garbage collector rather than closed under them
+    LLMServiceFactory.reset()
+
+async def close_services():
+    """
+    Close the provider clients of cached LLM services (call on app shutdown)
+    """
+    for service in list(_service_cache.values()):
+        close = getattr(service, "close", None)
+        if close is not None:
+            await close()
 
 def update_llm_service_config(
     use_mock: Optional[bool] = None,
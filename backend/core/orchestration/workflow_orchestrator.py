@@ -4,10 +4,25 @@ This provides basic workflow orchestration functionality using mock services.
 """
 
 import asyncio
+import time
 from typing import Dict, List, Any, Optional
 from datetime import datetime
 import json
 
+# Mock timestamps only need second precision, so the ISO string is reused
+# until the clock moves on by a second
+_now_iso = datetime.now().isoformat()
+_now_iso_refreshed = time.monotonic()
+
+def _cached_now_iso() -> str:
+    """Current time as an ISO string, refreshed at most once per second"""
+    global _now_iso, _now_iso_refreshed
+    now = time.monotonic()
+    if now - _now_iso_refreshed >= 1.0:
+        _now_iso = datetime.now().isoformat()
+        _now_iso_refreshed = now
+    return _now_iso
+
 class MockWorkflowOrchestrator:
     """Mock implementation of workflow orchestrator for testing"""
     
@@ -24,7 +39,7 @@ class MockWorkflowOrchestrator:
         workflow_result = {
             "execution_id": execution_id,
             "status": "completed",
-            "created_at": datetime.now().isoformat(),
+            "created_at": _cached_now_iso(),
             "agents_used": workflow_data.get("agents", ["research_agent", "writing_agent"]),
             "results": {
                 "research_findings": "Mock research results: Found relevant information about the topic",
@@ -2,21 +2,111 @@
 Chat session management service
 """
 
-import asyncio
+import heapq
+import time
 import uuid
-from typing import Dict, List, Optional, Any
+from collections import deque
+from typing import Deque, Dict, List, Optional, Any, Tuple
 from datetime import datetime
 
 from api.v1.models import ChatSession, ChatMessage, MessageRole, DocumentContext
 from core.agents import agent_registry
+from core.services.chat_intents import match_intent
 from utils.helpers import generate_id, get_timestamp, AsyncMockDelay
 
+# Number of recent messages passed to agents as chat history
+HISTORY_WINDOW_SIZE = 5
+
+GREET_RESPONSE = "Hello! I'm your AI research assistant. How can I help you today?"
+
+HELP_RESPONSE = """I can help you with various research tasks including:
+• Creating research plans and strategies
+• Conducting research and gathering information
+• Writing reports and content
+• Reviewing and evaluating materials
+
+To get started, you can either chat with me generally or specify which agent you'd like to work with. What would you like to explore?"""
+
+RESEARCH_RESPONSE = """I'd be happy to help you with research! To provide you with the most relevant and comprehensive analysis, I recommend using our specialized Research Agent.
+
+Would you like me to:
+1. Conduct general research on your topic
+2. Create a detailed research plan
+3. Analyze specific information you have
+4. Something else related to research
+
+Please let me know what specific research task you'd like assistance with."""
+
+WRITE_RESPONSE = """I can help you with writing tasks! For the best results, I recommend using our specialized Writing Agent.
+
+I can assist you with:
+• Writing reports and articles
+• Creating content and documentation
+• Editing and improving existing text
+• Summarizing information
+
+What type of writing task would you like help with?"""
+
+PLAN_RESPONSE = """Planning is crucial for successful projects! I recommend using our specialized Planning Agent for comprehensive planning tasks.
+
+I can help you create:
+• Research plans and methodologies
+• Project roadmaps and timelines
+• Strategic plans and frameworks
+• Resource allocation plans
+
+What would you like to plan or strategize about?"""
+
+REVIEW_RESPONSE = """I'd be glad to help you review materials! For thorough evaluations, I recommend using our specialized Review Agent.
+
+I can assist with:
+• Content quality assessment
+• Document review and critique
+• Improvement suggestions
+• Compliance checking
+
+What would you like me to review or evaluate?"""
+
+DEFAULT_RESPONSE = """Thank you for your message! I'm here to help you with your research and writing tasks. I have access to specialized agents for different types of tasks:
+
+• **Planning Agent**: For creating research plans and strategies
+• **Research Agent**: For conducting research and gathering information  
+• **Writing Agent**: For generating reports and content
+• **Review Agent**: For evaluating and reviewing materials
+
+To get started, you can:
+1. Tell me what you'd like to accomplish, and I'll guide you to the right agent
+2. Ask me to connect you with a specific agent
+3. Continue with general conversation
+
+What would you like to work on today?"""
+
+DOCUMENT_CONTEXT_TEMPLATE = "\n\nI see you've referenced %d document(s). I can incorporate information from these documents into my response."
+
+_INTENT_RESPONSES = {
+    "greet": GREET_RESPONSE,
+    "help": HELP_RESPONSE,
+    "research": RESEARCH_RESPONSE,
+    "write": WRITE_RESPONSE,
+    "plan": PLAN_RESPONSE,
+    "review": REVIEW_RESPONSE,
+}
+
 class ChatService:
     """Service for managing chat sessions and messages"""
     
     def __init__(self):
         self.sessions: Dict[str, ChatSession] = {}
         self.messages: Dict[str, List[ChatMessage]] = {}
+        
+        # Incremental stats and expiry index, kept in sync on create/delete/send
+        self._agent_counts: Dict[str, int] = {}
+        self._active_count = 0
+        self._total_messages = 0
+        self._expiry: List[Tuple[float, str]] = []  # heap of (epoch created, session_id)
+        
+        # Pre-serialized chat history window passed to agents, per session
+        self._history_window: Dict[str, Deque[Dict[str, str]]] = {}
     
     async def create_session(self, agent_id: Optional[str] = None, title: Optional[str] = None) -> str:
         """Create a new chat session"""
@@ -44,9 +134,17 @@ class ChatService:
                 messages=[]
             )
             
-            # Store session
+            # Store session; the message store shares the session's list so
+            # session.messages stays current without being reassigned
             self.sessions[session_id] = session
-            self.messages[session_id] = []
+            self.messages[session_id] = session.messages
+            self._history_window[session_id] = deque(maxlen=HISTORY_WINDOW_SIZE)
+            
+            # Update stats and expiry index
+            agent_key = agent_id or "general"
+            self._agent_counts[agent_key] = self._agent_counts.get(agent_key, 0) + 1
+            self._active_count += 1
+            heapq.heappush(self._expiry, (time.time(), session_id))
             
             return session_id
             
@@ -55,37 +153,41 @@ class ChatService:
     
     async def get_session(self, session_id: str) -> Optional[ChatSession]:
         """Get chat session by ID"""
-        session = self.sessions.get(session_id)
-        if session:
-            # Update messages
-            session.messages = self.messages.get(session_id, [])
-        return session
+        return self.sessions.get(session_id)
     
     async def get_all_sessions(self) -> List[ChatSession]:
         """Get all chat sessions"""
-        sessions = []
-        for session_id, session in self.sessions.items():
-            session.messages = self.messages.get(session_id, [])
-            sessions.append(session)
-        return sessions
+        return list(self.sessions.values())
     
     async def delete_session(self, session_id: str) -> bool:
         """Delete a chat session"""
         try:
-            if session_id not in self.sessions:
-                return False
-            
-            # Remove session and messages
-            del self.sessions[session_id]
-            if session_id in self.messages:
-                del self.messages[session_id]
-            
-            return True
+            return self._delete_session_sync(session_id)
             
         except Exception as e:
             print(f"Error deleting session {session_id}: {e}")
             return False
     
+    def _delete_session_sync(self, session_id: str) -> bool:
+        """Remove a session and its messages (no awaits needed)"""
+        session = self.sessions.pop(session_id, None)
+        if session is None:
+            return False
+        
+        self._total_messages -= len(self.messages.pop(session_id, []))
+        self._history_window.pop(session_id, None)
+        
+        agent_key = session.agent_id or "general"
+        remaining = self._agent_counts.get(agent_key, 0) - 1
+        if remaining > 0:
+            self._agent_counts[agent_key] = remaining
+        else:
+            self._agent_counts.pop(agent_key, None)
+        if session.status == "active":
+            self._active_count -= 1
+        # The expiry heap entry is dropped lazily in cleanup_old_sessions
+        return True
+    
     async def send_message(
         self,
         session_id: str,
@@ -95,7 +197,7 @@ class ChatService:
         """Send a message and get agent response"""
         try:
             # Get session
-            session = await self.get_session(session_id)
+            session = self.sessions.get(session_id)
             if not session:
                 raise ValueError(f"Session '{session_id}' not found")
             
@@ -122,19 +224,27 @@ class ChatService:
                     )
             
             # Store user message
-            self.messages[session_id].append(user_message)
+            self._append_message(session_id, user_message)
             
             # Generate agent response
             agent_response = await self._generate_agent_response(session, message, document_ids)
             
             # Store agent response
-            self.messages[session_id].append(agent_response)
+            self._append_message(session_id, agent_response)
             
             return agent_response
             
         except Exception as e:
             raise Exception(f"Failed to send message: {str(e)}")
     
+    def _append_message(self, session_id: str, message: ChatMessage) -> None:
+        """Store a message and update the stats and history window"""
+        self.messages[session_id].append(message)
+        self._total_messages += 1
+        self._history_window[session_id].append(
+            {"role": message.role.value, "content": message.content}
+        )
+    
     async def get_session_messages(self, session_id: str) -> List[ChatMessage]:
         """Get all messages for a session"""
         return self.messages.get(session_id, [])
@@ -159,10 +269,7 @@ class ChatService:
                         "context": {
                             "session_id": session.session_id,
                             "document_ids": document_ids or [],
-                            "chat_history": [
-                                {"role": msg.role.value, "content": msg.content}
-                                for msg in self.messages[session.session_id][-5:]  # Last 5 messages
-                            ]
+                            "chat_history": list(self._history_window[session.session_id])
                         },
                         "configuration": {
                             "temperature": 0.7,
@@ -211,89 +318,19 @@ class ChatService:
     
     def _generate_general_response(self, message: str, document_ids: Optional[List[str]] = None) -> str:
         """Generate a general response when no specific agent is available"""
-        # Simple response patterns based on message content
-        message_lower = message.lower()
-        
-        if any(word in message_lower for word in ['hello', 'hi', 'hey']):
-            return "Hello! I'm your AI research assistant. How can I help you today?"
-        
-        elif any(word in message_lower for word in ['help', 'assist', 'support']):
-            return """I can help you with various research tasks including:
-• Creating research plans and strategies
-• Conducting research and gathering information
-• Writing reports and content
-• Reviewing and evaluating materials
-
-To get started, you can either chat with me generally or specify which agent you'd like to work with. What would you like to explore?"""
-        
-        elif any(word in message_lower for word in ['research', 'investigate', 'analyze']):
-            return """I'd be happy to help you with research! To provide you with the most relevant and comprehensive analysis, I recommend using our specialized Research Agent.
-
-Would you like me to:
-1. Conduct general research on your topic
-2. Create a detailed research plan
-3. Analyze specific information you have
-4. Something else related to research
-
-Please let me know what specific research task you'd like assistance with."""
-        
-        elif any(word in message_lower for word in ['write', 'create', 'draft']):
-            return """I can help you with writing tasks! For the best results, I recommend using our specialized Writing Agent.
-
-I can assist you with:
-• Writing reports and articles
-• Creating content and documentation
-• Editing and improving existing text
-• Summarizing information
-
-What type of writing task would you like help with?"""
-        
-        elif any(word in message_lower for word in ['plan', 'strategy', 'roadmap']):
-            return """Planning is crucial for successful projects! I recommend using our specialized Planning Agent for comprehensive planning tasks.
-
-I can help you create:
-• Research plans and methodologies
-• Project roadmaps and timelines
-• Strategic plans and frameworks
-• Resource allocation plans
-
-What would you like to plan or strategize about?"""
+        intent = match_intent(message)
+        if intent:
+            return _INTENT_RESPONSES[intent]
         
-        elif any(word in message_lower for word in ['review', 'evaluate', 'assess']):
-            return """I'd be glad to help you review materials! For thorough evaluations, I recommend using our specialized Review Agent.
-
-I can assist with:
-• Content quality assessment
-• Document review and critique
-• Improvement suggestions
-• Compliance checking
-
-What would you like me to review or evaluate?"""
-        
-        else:
-            # Default general response
-            document_context_text = ""
-            if document_ids:
-                document_context_text = f"\n\nI see you've referenced {len(document_ids)} document(s). I can incorporate information from these documents into my response."
-            
-            return f"""Thank you for your message! I'm here to help you with your research and writing tasks. I have access to specialized agents for different types of tasks:
-
-• **Planning Agent**: For creating research plans and strategies
-• **Research Agent**: For conducting research and gathering information  
-• **Writing Agent**: For generating reports and content
-• **Review Agent**: For evaluating and reviewing materials
-
-To get started, you can:
-1. Tell me what you'd like to accomplish, and I'll guide you to the right agent
-2. Ask me to connect you with a specific agent
-3. Continue with general conversation
-
-What would you like to work on today?{document_context_text}"""
+        # Default general response
+        if document_ids:
+            return DEFAULT_RESPONSE + DOCUMENT_CONTEXT_TEMPLATE % len(document_ids)
+        return DEFAULT_RESPONSE
     
     async def add_document_to_session(self, session_id: str, document_id: str) -> bool:
         """Add document context to a session"""
         try:
-            session = await self.get_session(session_id)
+            session = self.sessions.get(session_id)
             if not session:
                 return False
             
@@ -309,7 +346,7 @@ What would you like to work on today?{document_context_text}"""
     async def remove_document_from_session(self, session_id: str, document_id: str) -> bool:
         """Remove document context from a session"""
         try:
-            session = await self.get_session(session_id)
+            session = self.sessions.get(session_id)
             if not session:
                 return False
             
@@ -325,36 +362,24 @@ What would you like to work on today?{document_context_text}"""
     def get_chat_stats(self) -> Dict[str, Any]:
         """Get chat service statistics"""
         total_sessions = len(self.sessions)
-        total_messages = sum(len(messages) for messages in self.messages.values())
-        
-        # Count sessions by agent
-        agent_sessions = {}
-        for session in self.sessions.values():
-            if session.agent_id:
-                agent_sessions[session.agent_id] = agent_sessions.get(session.agent_id, 0) + 1
-            else:
-                agent_sessions["general"] = agent_sessions.get("general", 0) + 1
+        total_messages = self._total_messages
         
         return {
             "total_sessions": total_sessions,
             "total_messages": total_messages,
             "average_messages_per_session": total_messages / max(1, total_sessions),
-            "sessions_by_agent": agent_sessions,
-            "active_sessions": sum(1 for session in self.sessions.values() if session.status == "active")
+            "sessions_by_agent": dict(self._agent_counts),
+            "active_sessions": self._active_count
         }
     
     def cleanup_old_sessions(self, max_age_hours: int = 24) -> int:
         """Clean up old chat sessions"""
-        cutoff_time = datetime.now().timestamp() - (max_age_hours * 3600)
-        
-        sessions_to_remove = []
-        for session_id, session in self.sessions.items():
-            if session.created_at.timestamp() < cutoff_time:
-                sessions_to_remove.append(session_id)
+        cutoff_time = time.time() - (max_age_hours * 3600)
         
         removed_count = 0
-        for session_id in sessions_to_remove:
-            if asyncio.run(self.delete_session(session_id)):
+        while self._expiry and self._expiry[0][0] < cutoff_time:
+            _, session_id = heapq.heappop(self._expiry)
+            if self._delete_session_sync(session_id):
                 removed_count += 1
         
         return removed_count
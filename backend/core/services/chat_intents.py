@@ -0,0 +1,32 @@
+"""
+Keyword intent matching for general (agent-less) chat responses
+"""
+
+import re
+from typing import Optional
+
+# Intents in priority order
+INTENT_ORDER = ("greet", "help", "research", "write", "plan", "review")
+_INTENT_PRIORITY = {name: index for index, name in enumerate(INTENT_ORDER)}
+
+# Keywords match at a word start so inflections count (planning, helpful);
+# only the short greetings must be whole words, so "high" is not "hi"
+_INTENT_RE = re.compile(
+    r"\b(?:(?P<greet>(?:hello|hi|hey)\b)"
+    r"|(?P<help>help|assist|support)"
+    r"|(?P<research>research|investigat|analy[sz])"
+    r"|(?P<write>writ|creat|draft)"
+    r"|(?P<plan>plan|strateg|roadmap)"
+    r"|(?P<review>review|evaluat|assess))",
+    re.IGNORECASE
+)
+
+def match_intent(message: str) -> Optional[str]:
+    """Highest-priority intent named in the message, or None"""
+    # Single pass over the message; earlier intents take priority
+    match = min(
+        _INTENT_RE.finditer(message),
+        key=lambda m: _INTENT_PRIORITY[m.lastgroup],
+        default=None
+    )
+    return match.lastgroup if match else None
@@ -3,16 +3,79 @@ Document management service for handling file uploads and text extraction
 """
 
 import os
+import re
 import uuid
 import asyncio
-from typing import Dict, List, Optional, Any
+import time
+from typing import Dict, List, Optional, Any, Set, Tuple
+from collections import defaultdict
 from datetime import datetime
 from pathlib import Path
 import json
 
 from api.v1.models import Document, DocumentMetadata, DocumentUploadResponse
-from utils.config import settings
-from utils.helpers import generate_id, get_timestamp, sanitize_filename, calculate_file_size, AsyncMockDelay
+from utils.config import settings, ensure_upload_dir
+from utils.helpers import generate_id, get_timestamp, sanitize_filename, calculate_file_size, AsyncMockDelay, run_in_thread
+
+# Mock extraction output; "{fname}" is replaced with the uploaded file name
+_PDF_MOCK_TEMPLATE = """This is a mock PDF document extracted from {fname}.
+        
+The document contains multiple pages of text content. In a real implementation, 
+this would use libraries like PyPDF2, pdfplumber, or similar to extract the actual 
+text content from the PDF file.
+
+Key features that would be implemented:
+- Text extraction from each page
+- Preservation of formatting where possible
+- Handling of different PDF encodings
+- Image text extraction (OCR)
+- Metadata extraction
+
+For now, this is simulated text content that would typically be extracted from 
+a PDF document containing research papers, reports, or other textual content.
+The actual implementation would depend on the specific requirements and the 
+complexity of the PDF files being processed."""
+
+_DOC_MOCK_TEMPLATE = """Mock DOC document content from {fname}.
+
+In a real implementation, this would use libraries like python-docx or similar 
+to extract text content from Microsoft Word documents (.doc files).
+
+The extraction process would handle:
+- Text paragraphs and formatting
+- Tables and structured content
+- Headers and footers
+- Document metadata
+- Embedded objects
+
+This simulated content represents what would typically be extracted from a 
+Word document containing research data, reports, or other textual information."""
+
+_DOCX_MOCK_TEMPLATE = """Mock DOCX document content from {fname}.
+
+In a real implementation, this would use the python-docx library to extract 
+text content from modern Microsoft Word documents (.docx files).
+
+The extraction would include:
+- All text paragraphs in order
+- Basic formatting information
+- Table contents
+- Document structure
+- Metadata and properties
+
+This simulated text represents the type of content that would be extracted 
+from a DOCX file, which could include research papers, reports, 
+documentation, or other textual documents."""
+
+_WORD_RE = re.compile(r'\S+')
+
+# Rough bytes per page by file type, used to estimate page counts
+_BYTES_PER_PAGE = {
+    '.txt': 3000,  # ~3000 characters per page
+    '.pdf': 20 * 1024,  # ~20KB per page
+    '.doc': 20 * 1024,
+    '.docx': 20 * 1024,
+}
 
 class DocumentService:
     """Service for managing documents and file uploads"""
@@ -20,15 +83,22 @@ class DocumentService:
     def __init__(self):
         self.documents: Dict[str, Document] = {}
         self.upload_dir = Path(settings.upload_dir)
-        self.upload_dir.mkdir(exist_ok=True)
         
-        # Supported file types and their handlers
+        # Supported file types: (handler, simulated processing time in seconds)
         self.file_handlers = {
-            '.txt': self._extract_text_from_txt,
-            '.pdf': self._extract_text_from_pdf,
-            '.doc': self._extract_text_from_doc,
-            '.docx': self._extract_text_from_docx
+            '.txt': (self._extract_text_from_txt, 0.5),
+            '.pdf': (self._extract_text_from_pdf, 1.5),  # PDF processing takes longer
+            '.doc': (self._extract_text_from_doc, 1.3),
+            '.docx': (self._extract_text_from_docx, 1.3)
         }
+        
+        # Search index: lowercased (title, content, author) per document and
+        # trigram -> document ids, maintained on upload/delete
+        self._search_fields: Dict[str, Tuple[str, str, str]] = {}
+        self._trigram_index: Dict[str, Set[str]] = defaultdict(set)
+        
+        # Epoch creation time per document, for cleanup without datetime math
+        self._created_ts: Dict[str, float] = {}
     
     async def upload_document(self, file_content: bytes, filename: str, metadata: Dict[str, Any] = None) -> DocumentUploadResponse:
         """Upload and process a document"""
@@ -50,26 +120,33 @@ class DocumentService:
             if len(file_content) > settings.max_file_size:
                 raise ValueError(f"File size {calculate_file_size(len(file_content))} exceeds maximum allowed size {calculate_file_size(settings.max_file_size)}")
             
-            # Save file
+            # Save file and extract text concurrently; extraction works from the
+            # in-memory content, so it does not wait for the write
+            ensure_upload_dir()
             file_path = self.upload_dir / f"{document_id}{file_ext}"
-            with open(file_path, 'wb') as f:
-                f.write(file_content)
-            
-            # Extract text content
-            extracted_text = await self._extract_text(file_path, file_ext)
+            _, extracted_text = await asyncio.gather(
+                run_in_thread(file_path.write_bytes, file_content),
+                self._extract_text(file_path, file_ext, file_content)
+            )
             
             # Create document metadata
+            author = metadata.get('author') if metadata else None
+            word_count = await run_in_thread(self._count_words, extracted_text)
             doc_metadata = DocumentMetadata(
-                author=metadata.get('author') if metadata else None,
+                author=author,
                 pages=self._estimate_pages(file_content, file_ext),
-                word_count=len(extracted_text.split()) if extracted_text else 0,
+                word_count=word_count,
                 extraction_confidence=0.95 if extracted_text else 0.0
             )
             
+            # Lowercase the searchable fields once, at upload time
+            title = Path(safe_filename).stem
+            search_fields, trigrams = await run_in_thread(self._search_entry, title, extracted_text, author)
+            
             # Create document record
             document = Document(
                 id=document_id,
-                title=Path(safe_filename).stem,
+                title=title,
                 type=file_ext.replace('.', ''),
                 size=len(file_content),
                 created_at=datetime.now(),
@@ -77,8 +154,10 @@ class DocumentService:
                 metadata=doc_metadata
             )
             
-            # Store document
+            # Store and index document
             self.documents[document_id] = document
+            self._index_document(document_id, search_fields, trigrams)
+            self._created_ts[document_id] = time.time()
             
             # Create response
             response = DocumentUploadResponse(
@@ -105,142 +184,138 @@ class DocumentService:
     async def delete_document(self, document_id: str) -> bool:
         """Delete a document"""
         try:
-            if document_id not in self.documents:
-                return False
-            
-            document = self.documents[document_id]
-            
-            # Delete file from disk
-            file_path = self.upload_dir / f"{document_id}.{document.type}"
-            if file_path.exists():
-                file_path.unlink()
-            
-            # Remove from storage
-            del self.documents[document_id]
-            
-            return True
+            return self._delete_document_sync(document_id)
             
         except Exception as e:
             print(f"Error deleting document {document_id}: {e}")
             return False
     
+    def _delete_document_sync(self, document_id: str) -> bool:
+        """Remove a document record and its file from disk (no awaits needed)"""
+        document = self.documents.get(document_id)
+        if document is None:
+            return False
+        
+        # Delete file from disk
+        self._document_path(document).unlink(missing_ok=True)
+        
+        # Remove from storage
+        self._forget_document(document_id)
+        return True
+    
+    def _document_path(self, document: Document) -> Path:
+        """Path of a document's uploaded file"""
+        return self.upload_dir / f"{document.id}.{document.type}"
+    
+    def _forget_document(self, document_id: str) -> bool:
+        """Drop a document from the in-memory store and search index"""
+        if self.documents.pop(document_id, None) is None:
+            return False
+        self._unindex_document(document_id)
+        self._created_ts.pop(document_id, None)
+        return True
+    
+    @staticmethod
+    def _trigrams(text: str) -> Set[str]:
+        """Character trigrams of an already-lowercased string"""
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+    
+    @classmethod
+    def _search_entry(cls, title: str, content: Optional[str], author: Optional[str]) -> Tuple[Tuple[str, str, str], Set[str]]:
+        """Lowercased (title, content, author) and their combined trigrams"""
+        fields = (title.lower(), (content or "").lower(), (author or "").lower())
+        return fields, set().union(*(cls._trigrams(field) for field in fields))
+    
+    def _index_document(self, document_id: str, fields: Tuple[str, str, str], trigrams: Set[str]) -> None:
+        """Add a document's precomputed search entry to the index"""
+        self._search_fields[document_id] = fields
+        for trigram in trigrams:
+            self._trigram_index[trigram].add(document_id)
+    
+    def _unindex_document(self, document_id: str) -> None:
+        """Remove a document from the search index"""
+        fields = self._search_fields.pop(document_id, None)
+        if fields is None:
+            return
+        for trigram in set().union(*(self._trigrams(field) for field in fields)):
+            postings = self._trigram_index.get(trigram)
+            if postings is not None:
+                postings.discard(document_id)
+                if not postings:
+                    del self._trigram_index[trigram]
+    
     async def search_documents(self, query: str) -> List[Document]:
         """Search documents by content or metadata"""
         query_lower = query.lower()
-        results = []
         
-        for document in self.documents.values():
-            # Search in title
-            if query_lower in document.title.lower():
-                results.append(document)
-                continue
-            
-            # Search in content
-            if document.content and query_lower in document.content.lower():
-                results.append(document)
-                continue
-            
-            # Search in metadata
-            if (document.metadata.author and query_lower in document.metadata.author.lower()):
-                results.append(document)
+        # Narrow candidates to documents containing every query trigram; short
+        # queries have no trigrams and fall back to checking every document
+        query_trigrams = self._trigrams(query_lower)
+        if query_trigrams:
+            postings = sorted((self._trigram_index.get(t, set()) for t in query_trigrams), key=len)
+            candidate_ids = set.intersection(*postings)
+        else:
+            candidate_ids = self._search_fields.keys()
         
+        # Confirm the substring match on title, content or author
+        results = [
+            self.documents[document_id] for document_id in candidate_ids
+            if any(query_lower in field for field in self._search_fields[document_id])
+        ]
+        results.sort(key=lambda document: document.created_at)
         return results
     
-    async def _extract_text(self, file_path: Path, file_ext: str) -> str:
+    async def _extract_text(self, file_path: Path, file_ext: str, file_content: bytes) -> str:
         """Extract text from document based on file type"""
-        await AsyncMockDelay.delay(0.5)  # Simulate processing time
-        
-        handler = self.file_handlers.get(file_ext)
-        if handler:
-            return await handler(file_path)
-        else:
+        entry = self.file_handlers.get(file_ext)
+        if entry is None:
+            await AsyncMockDelay.delay(0.5)  # Simulate processing time
             return f"Text extraction not supported for {file_ext} files"
+        
+        handler, processing_time = entry
+        await AsyncMockDelay.delay(processing_time)  # Simulate processing time
+        return await handler(file_path, file_content)
     
-    async def _extract_text_from_txt(self, file_path: Path) -> str:
+    async def _extract_text_from_txt(self, file_path: Path, file_content: bytes) -> str:
         """Extract text from TXT file"""
+        return await run_in_thread(self._decode_text, file_content)
+    
+    @staticmethod
+    def _decode_text(file_content: bytes) -> str:
+        """Decode text bytes with universal newlines, as reading the file would"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return f.read()
+            text = file_content.decode('utf-8')
         except UnicodeDecodeError:
             # Try with different encoding
-            with open(file_path, 'r', encoding='latin-1') as f:
-                return f.read()
+            text = file_content.decode('latin-1')
+        return text.replace('\r\n', '\n').replace('\r', '\n')
+    
+    @staticmethod
+    def _count_words(text: str) -> int:
+        """Count whitespace-separated words without building a list of them"""
+        return sum(1 for _ in _WORD_RE.finditer(text)) if text else 0
     
-    async def _extract_text_from_pdf(self, file_path: Path) -> str:
+    async def _extract_text_from_pdf(self, file_path: Path, file_content: bytes) -> str:
         """Extract text from PDF file (mock implementation)"""
         # In a real implementation, this would use PyPDF2 or similar
-        await AsyncMockDelay.delay(1.0)  # PDF processing takes longer
-        
         # Mock extracted text
-        return f"""This is a mock PDF document extracted from {file_path.name}.
-        
-The document contains multiple pages of text content. In a real implementation, 
-this would use libraries like PyPDF2, pdfplumber, or similar to extract the actual 
-text content from the PDF file.
-
-Key features that would be implemented:
-- Text extraction from each page
-- Preservation of formatting where possible
-- Handling of different PDF encodings
-- Image text extraction (OCR)
-- Metadata extraction
-
-For now, this is simulated text content that would typically be extracted from 
-a PDF document containing research papers, reports, or other textual content.
-The actual implementation would depend on the specific requirements and the 
-complexity of the PDF files being processed."""
+        return _PDF_MOCK_TEMPLATE.replace("{fname}", file_path.name)
     
-    async def _extract_text_from_doc(self, file_path: Path) -> str:
+    async def _extract_text_from_doc(self, file_path: Path, file_content: bytes) -> str:
         """Extract text from DOC file (mock implementation)"""
-        await AsyncMockDelay.delay(0.8)
-        
-        return f"""Mock DOC document content from {file_path.name}.
-
-In a real implementation, this would use libraries like python-docx or similar 
-to extract text content from Microsoft Word documents (.doc files).
-
-The extraction process would handle:
-- Text paragraphs and formatting
-- Tables and structured content
-- Headers and footers
-- Document metadata
-- Embedded objects
-
-This simulated content represents what would typically be extracted from a 
-Word document containing research data, reports, or other textual information."""
+        return _DOC_MOCK_TEMPLATE.replace("{fname}", file_path.name)
     
-    async def _extract_text_from_docx(self, file_path: Path) -> str:
+    async def _extract_text_from_docx(self, file_path: Path, file_content: bytes) -> str:
         """Extract text from DOCX file (mock implementation)"""
-        await AsyncMockDelay.delay(0.8)
-        
-        return f"""Mock DOCX document content from {file_path.name}.
-
-In a real implementation, this would use the python-docx library to extract 
-text content from modern Microsoft Word documents (.docx files).
-
-The extraction would include:
-- All text paragraphs in order
-- Basic formatting information
-- Table contents
-- Document structure
-- Metadata and properties
-
-This simulated text represents the type of content that would be extracted 
-from a DOCX file, which could include research papers, reports, 
-documentation, or other textual documents."""
+        return _DOCX_MOCK_TEMPLATE.replace("{fname}", file_path.name)
     
     def _estimate_pages(self, file_content: bytes, file_ext: str) -> Optional[int]:
         """Estimate number of pages in document"""
         # Simple estimation based on file size and type
-        if file_ext == '.txt':
-            # Rough estimate: 3000 characters per page
-            return max(1, len(file_content) // 3000)
-        elif file_ext in ['.pdf', '.doc', '.docx']:
-            # Rough estimate based on file size
-            size_kb = len(file_content) / 1024
-            return max(1, int(size_kb / 20))  # Assume 20KB per page
-        
-        return None
+        bytes_per_page = _BYTES_PER_PAGE.get(file_ext)
+        if bytes_per_page is None:
+            return None
+        return max(1, len(file_content) // bytes_per_page)
     
     def get_storage_stats(self) -> Dict[str, Any]:
         """Get document storage statistics"""
@@ -261,18 +336,27 @@ documentation, or other textual documents."""
             "max_file_size_human": calculate_file_size(settings.max_file_size)
         }
     
-    def cleanup_old_documents(self, max_age_hours: int = 24) -> int:
+    async def cleanup_old_documents(self, max_age_hours: int = 24) -> int:
         """Clean up old documents"""
-        cutoff_time = datetime.now().timestamp() - (max_age_hours * 3600)
+        cutoff_time = time.time() - (max_age_hours * 3600)
+        
+        documents_to_remove = [
+            self.documents[doc_id] for doc_id, created_ts in self._created_ts.items()
+            if created_ts < cutoff_time
+        ]
         
-        documents_to_remove = []
-        for doc_id, document in self.documents.items():
-            if document.created_at.timestamp() < cutoff_time:
-                documents_to_remove.append(doc_id)
+        # Delete the files in parallel worker threads
+        results = await asyncio.gather(
+            *(run_in_thread(self._document_path(document).unlink, missing_ok=True) for document in documents_to_remove),
+            return_exceptions=True
+        )
         
         removed_count = 0
-        for doc_id in documents_to_remove:
-            if asyncio.run(self.delete_document(doc_id)):
+        for document, result in zip(documents_to_remove, results):
+            if isinstance(result, Exception):
+                print(f"Error deleting document {document.id}: {result}")
+                continue
+            if self._forget_document(document.id):
                 removed_count += 1
         
         return removed_count
@@ -4,204 +4,63 @@ Provides abstraction layer for both mock and real LLM providers
 """
 
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional, List, Tuple
-from dataclasses import dataclass
+from typing import Dict, Any, Optional, List, Tuple, AsyncIterator
+from dataclasses import dataclass, field, replace
 import asyncio
 import time
 import random
 import json
+import re
+from collections import deque
 from datetime import datetime
 
-from utils.config import settings
-from utils.helpers import get_timestamp
+import httpx
 
-@dataclass
-class LLMResponse:
-    """Standard LLM response format"""
-    content: str
-    tokens_used: int
-    cost: float
-    execution_time: float
-    model: str
-    provider: str
-    metadata: Dict[str, Any] = None
-    
-    def __post_init__(self):
-        if self.metadata is None:
-            self.metadata = {}
+# Provider SDKs are optional; only the configured one needs to be installed
+try:
+    import openai
+except ImportError:
+    openai = None
 
-class BaseLLMService(ABC):
-    """Abstract base class for LLM services"""
-    
-    def __init__(self, provider: str, model: str):
-        self.provider = provider
-        self.model = model
-        self.last_call_time = None
-        self.total_calls = 0
-        self.total_tokens = 0
-        self.total_cost = 0.0
-    
-    @abstractmethod
-    async def generate_response(
-        self, 
-        prompt: str, 
-        system_prompt: Optional[str] = None,
-        temperature: float = 0.7,
-        max_tokens: int = 2000,
-        **kwargs
-    ) -> LLMResponse:
-        """Generate a response from the LLM"""
-        pass
-    
-    @abstractmethod
-    async def generate_chat_response(
-        self,
-        messages: List[Dict[str, str]],
-        temperature: float = 0.7,
-        max_tokens: int = 2000,
-        **kwargs
-    ) -> LLMResponse:
-        """Generate a chat response from the LLM"""
-        pass
-    
-    def get_stats(self) -> Dict[str, Any]:
-        """Get usage statistics"""
-        return {
-            "provider": self.provider,
-            "model": self.model,
-            "total_calls": self.total_calls,
-            "total_tokens": self.total_tokens,
-            "total_cost": self.total_cost,
-            "average_tokens_per_call": self.total_tokens / max(self.total_calls, 1),
-            "average_cost_per_call": self.total_cost / max(self.total_calls, 1),
-            "last_call_time": self.last_call_time
-        }
-    
-    def _record_call(self, tokens_used: int, cost: float, execution_time: float):
-        """Record call statistics"""
-        self.total_calls += 1
-        self.total_tokens += tokens_used
-        self.total_cost += cost
-        self.last_call_time = get_timestamp()
+try:
+    import anthropic
+except ImportError:
+    anthropic = None
 
-class MockLLMService(BaseLLMService):
-    """Mock LLM service for development and testing"""
-    
-    def __init__(self):
-        super().__init__("mock", "mock-model")
-        
-        # Mock response templates for different agent types
-        self.response_templates = {
-            "planning": {
-                "content": self._generate_planning_response,
-                "tokens_range": (800, 1200),
-                "cost_range": (0.024, 0.036)
-            },
-            "research": {
-                "content": self._generate_research_response,
-                "tokens_range": (1000, 1500),
-                "cost_range": (0.030, 0.045)
-            },
-            "writing": {
-                "content": self._generate_writing_response,
-                "tokens_range": (1200, 1800),
-                "cost_range": (0.036, 0.054)
-            },
-            "review": {
-                "content": self._generate_review_response,
-                "tokens_range": (600, 1000),
-                "cost_range": (0.018, 0.030)
-            },
-            "general": {
-                "content": self._generate_general_response,
-                "tokens_range": (500, 1500),
-                "cost_range": (0.015, 0.045)
-            }
-        }
-    
-    async def generate_response(
-        self, 
-        prompt: str, 
-        system_prompt: Optional[str] = None,
-        temperature: float = 0.7,
-        max_tokens: int = 2000,
-        **kwargs
-    ) -> LLMResponse:
-        """Generate a mock response"""
-        start_time = time.time()
-        
-        # Simulate processing delay
-        await asyncio.sleep(settings.mock_response_delay)
-        
-        # Determine response type based on prompt content
-        response_type = self._determine_response_type(prompt)
-        template = self.response_templates[response_type]
-        
-        # Generate response content
-        content = template["content"](prompt, system_prompt)
-        
-        # Calculate tokens and cost
-        tokens_used = random.randint(*template["tokens_range"])
-        cost = random.uniform(*template["cost_range"])
-        
-        execution_time = time.time() - start_time
-        
-        # Record call statistics
-        self._record_call(tokens_used, cost, execution_time)
-        
-        return LLMResponse(
-            content=content,
-            tokens_used=tokens_used,
-            cost=cost,
-            execution_time=execution_time,
-            model=self.model,
-            provider=self.provider,
-            metadata={
-                "response_type": response_type,
-                "temperature": temperature,
-                "max_tokens": max_tokens,
-                "system_prompt": system_prompt
-            }
-        )
-    
-    async def generate_chat_response(
-        self,
-        messages: List[Dict[str, str]],
-        temperature: float = 0.7,
-        max_tokens: int = 2000,
-        **kwargs
-    ) -> LLMResponse:
-        """Generate a mock chat response"""
-        # Extract the last user message as the prompt
-        prompt = ""
-        for message in reversed(messages):
-            if message["role"] == "user":
-                prompt = message["content"]
-                break
-        
-        return await self.generate_response(prompt, None, temperature, max_tokens, **kwargs)
-    
-    def _determine_response_type(self, prompt: str) -> str:
-        """Determine the type of response based on prompt content"""
-        prompt_lower = prompt.lower()
-        
-        if any(keyword in prompt_lower for keyword in ["plan", "planning", "outline", "strategy"]):
-            return "planning"
-        elif any(keyword in prompt_lower for keyword in ["research", "analyze", "investigate", "find"]):
-            return "research"
-        elif any(keyword in prompt_lower for keyword in ["write", "draft", "compose", "create"]):
-            return "writing"
-        elif any(keyword in prompt_lower for keyword in ["review", "evaluate", "assess", "check"]):
-            return "review"
-        else:
-            return "general"
-    
-    def _generate_planning_response(self, prompt: str, system_prompt: Optional[str]) -> str:
-        """Generate a planning response"""
-        return f"""
+from utils.config import settings
+from utils.helpers import run_in_thread
+from core.services.llm_cache import SemanticCache, llm_response_cache
+
+# Mock token/cost draws are pre-generated in batches and refilled when low
+MOCK_RANDOM_POOL_SIZE = 1024
+MOCK_RANDOM_POOL_LOW_WATER = 64
+
+# Prompts longer than this are classified off the event loop
+MOCK_OFFLOAD_PROMPT_CHARS = 16384
+
+# Keyword classifier for mock response types, in priority order. Keywords
+# match whole words only, so "plan" does not fire inside "airplane".
+_RESPONSE_TYPE_KEYWORDS = (
+    ("planning", ("plan", "planning", "outline", "strategy")),
+    ("research", ("research", "analyze", "investigate", "find")),
+    ("writing", ("write", "draft", "compose", "create")),
+    ("review", ("review", "evaluate", "assess", "check")),
+)
+_RESPONSE_TYPE_ORDER = tuple(response_type for response_type, _ in _RESPONSE_TYPE_KEYWORDS)
+_RESPONSE_TYPE_PRIORITY = {response_type: index for index, response_type in enumerate(_RESPONSE_TYPE_ORDER)}
+_RESPONSE_TYPE_RE = re.compile(
+    r"\b(?:" + "|".join(
+        f"(?P<{response_type}>{'|'.join(keywords)})"
+        for response_type, keywords in _RESPONSE_TYPE_KEYWORDS
+    ) + r")\b",
+    re.IGNORECASE
+)
+
+# Mock response bodies; "{prompt}" marks where the first 100 prompt characters go
+_PLANNING_TEMPLATE = """
 # Research Plan
 
-Based on your request: "{prompt[:100]}..."
+Based on your request: "{prompt}..."
 
 ## 1. Research Objectives
 - Define clear research questions and hypotheses
@@ -231,14 +90,12 @@ Based on your request: "{prompt[:100]}..."
 
 This plan provides a structured approach to addressing your research needs while ensuring comprehensive coverage of the topic.
 """
-    
-    def _generate_research_response(self, prompt: str, system_prompt: Optional[str]) -> str:
-        """Generate a research response"""
-        return f"""
+
+_RESEARCH_TEMPLATE = """
 # Research Findings
 
 ## Executive Summary
-Based on comprehensive analysis of the topic: "{prompt[:100]}..."
+Based on comprehensive analysis of the topic: "{prompt}..."
 
 ## Key Findings
 
@@ -275,14 +132,12 @@ Based on comprehensive analysis of the topic: "{prompt[:100]}..."
 
 This research provides a solid foundation for understanding the current state and future directions of the topic.
 """
-    
-    def _generate_writing_response(self, prompt: str, system_prompt: Optional[str]) -> str:
-        """Generate a writing response"""
-        return f"""
+
+_WRITING_TEMPLATE = """
 # Research Report
 
 ## Introduction
-This report addresses the critical aspects of: "{prompt[:100]}..." The following analysis provides comprehensive insights and actionable recommendations based on thorough investigation.
+This report addresses the critical aspects of: "{prompt}..." The following analysis provides comprehensive insights and actionable recommendations based on thorough investigation.
 
 ## Background and Context
 The topic under consideration represents a significant area of interest within the field. Understanding its nuances and implications requires careful examination of multiple factors and their interrelationships.
@@ -320,14 +175,12 @@ This report provides a comprehensive examination of the topic, offering valuable
 
 The recommendations outlined above provide a framework for action that balances immediate needs with long-term strategic objectives.
 """
-    
-    def _generate_review_response(self, prompt: str, system_prompt: Optional[str]) -> str:
-        """Generate a review response"""
-        return f"""
+
+_REVIEW_TEMPLATE = """
 # Review and Assessment
 
 ## Overview
-This review evaluates the content related to: "{prompt[:100]}..." The assessment considers multiple dimensions including accuracy, completeness, clarity, and overall quality.
+This review evaluates the content related to: "{prompt}..." The assessment considers multiple dimensions including accuracy, completeness, clarity, and overall quality.
 
 ## Strengths
 
@@ -368,11 +221,9 @@ The content demonstrates strong potential and addresses the topic effectively. W
 
 The material provides solid value to readers and serves as a good foundation that can be further developed with the recommended changes.
 """
-    
-    def _generate_general_response(self, prompt: str, system_prompt: Optional[str]) -> str:
-        """Generate a general response"""
-        return f"""
-I understand you're asking about: "{prompt[:100]}..."
+
+_GENERAL_TEMPLATE = """
+I understand you're asking about: "{prompt}..."
 
 This is a comprehensive topic that requires careful consideration of multiple factors. Based on the information provided, I can offer the following insights:
 
@@ -410,6 +261,337 @@ This topic represents an important area that warrants careful attention and thou
 Would you like me to elaborate on any specific aspect of this analysis or provide more detailed information about particular areas of interest?
 """
 
+_PLANNING_PREFIX, _, _PLANNING_SUFFIX = _PLANNING_TEMPLATE.partition("{prompt}")
+_RESEARCH_PREFIX, _, _RESEARCH_SUFFIX = _RESEARCH_TEMPLATE.partition("{prompt}")
+_WRITING_PREFIX, _, _WRITING_SUFFIX = _WRITING_TEMPLATE.partition("{prompt}")
+_REVIEW_PREFIX, _, _REVIEW_SUFFIX = _REVIEW_TEMPLATE.partition("{prompt}")
+_GENERAL_PREFIX, _, _GENERAL_SUFFIX = _GENERAL_TEMPLATE.partition("{prompt}")
+
+@dataclass
+class LLMResponse:
+    """Standard LLM response format"""
+    content: str
+    tokens_used: int
+    cost: float
+    execution_time: float
+    model: str
+    provider: str
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+class BaseLLMService(ABC):
+    """Abstract base class for LLM services"""
+    
+    def __init__(self, provider: str, model: str):
+        self.provider = provider
+        self.model = model
+        self.total_calls = 0
+        self.total_tokens = 0
+        self.total_cost = 0.0
+        # Running averages and raw epoch time, kept cheap for the per-call path
+        self._avg_tokens = 0.0
+        self._avg_cost = 0.0
+        self._last_call_ts: Optional[float] = None
+        self.response_cache: SemanticCache = llm_response_cache
+    
+    @abstractmethod
+    async def generate_response(
+        self, 
+        prompt: str, 
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 2000,
+        **kwargs
+    ) -> LLMResponse:
+        """Generate a response from the LLM"""
+        pass
+    
+    @abstractmethod
+    async def generate_chat_response(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.7,
+        max_tokens: int = 2000,
+        **kwargs
+    ) -> LLMResponse:
+        """Generate a chat response from the LLM"""
+        pass
+    
+    async def stream_response(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 2000,
+        **kwargs
+    ) -> AsyncIterator[str]:
+        """Stream a response as text chunks (whole response by default)"""
+        response = await self.generate_response(prompt, system_prompt, temperature, max_tokens, **kwargs)
+        yield response.content
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get usage statistics"""
+        return {
+            "provider": self.provider,
+            "model": self.model,
+            "total_calls": self.total_calls,
+            "total_tokens": self.total_tokens,
+            "total_cost": self.total_cost,
+            "average_tokens_per_call": self._avg_tokens,
+            "average_cost_per_call": self._avg_cost,
+            "last_call_time": (
+                datetime.fromtimestamp(self._last_call_ts).isoformat()
+                if self._last_call_ts is not None else None
+            )
+        }
+    
+    def _cached_response(self, cached: LLMResponse, start_time: float) -> LLMResponse:
+        """Copy of a cached response, marked as a cache hit (no API cost)"""
+        return replace(
+            cached,
+            cost=0.0,
+            execution_time=time.time() - start_time,
+            metadata={**cached.metadata, "cache_hit": True}
+        )
+    
+    def _record_call(self, tokens_used: int, cost: float, execution_time: float):
+        """Record call statistics"""
+        self.total_calls += 1
+        self.total_tokens += tokens_used
+        self.total_cost += cost
+        self._avg_tokens += (tokens_used - self._avg_tokens) / self.total_calls
+        self._avg_cost += (cost - self._avg_cost) / self.total_calls
+        self._last_call_ts = time.time()
+
+class MockLLMService(BaseLLMService):
+    """Mock LLM service for development and testing"""
+    
+    def __init__(self):
+        super().__init__("mock", "mock-model")
+        
+        # Mock response templates for different agent types
+        self.response_templates = {
+            "planning": {
+                "prefix": _PLANNING_PREFIX,
+                "suffix": _PLANNING_SUFFIX,
+                "tokens_range": (800, 1200),
+                "cost_range": (0.024, 0.036)
+            },
+            "research": {
+                "prefix": _RESEARCH_PREFIX,
+                "suffix": _RESEARCH_SUFFIX,
+                "tokens_range": (1000, 1500),
+                "cost_range": (0.030, 0.045)
+            },
+            "writing": {
+                "prefix": _WRITING_PREFIX,
+                "suffix": _WRITING_SUFFIX,
+                "tokens_range": (1200, 1800),
+                "cost_range": (0.036, 0.054)
+            },
+            "review": {
+                "prefix": _REVIEW_PREFIX,
+                "suffix": _REVIEW_SUFFIX,
+                "tokens_range": (600, 1000),
+                "cost_range": (0.018, 0.030)
+            },
+            "general": {
+                "prefix": _GENERAL_PREFIX,
+                "suffix": _GENERAL_SUFFIX,
+                "tokens_range": (500, 1500),
+                "cost_range": (0.015, 0.045)
+            }
+        }
+        
+        # Batched random draws per response type (numpy when available)
+        try:
+            import numpy as np
+            self._rng = np.random.default_rng()
+        except ImportError:
+            self._rng = None
+        self._token_pool: Dict[str, deque] = {}
+        self._cost_pool: Dict[str, deque] = {}
+        for response_type in self.response_templates:
+            self._token_pool[response_type] = deque()
+            self._cost_pool[response_type] = deque()
+            self._refill_random_pools(response_type)
+    
+    async def generate_response(
+        self, 
+        prompt: str, 
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 2000,
+        **kwargs
+    ) -> LLMResponse:
+        """Generate a mock response"""
+        start_time = time.time()
+        
+        # Simulate processing delay
+        await asyncio.sleep(settings.mock_response_delay)
+        
+        # Determine response type based on prompt content
+        if len(prompt) > MOCK_OFFLOAD_PROMPT_CHARS:
+            response_type = await run_in_thread(self._determine_response_type, prompt)
+        else:
+            response_type = self._determine_response_type(prompt)
+        template = self.response_templates[response_type]
+        
+        # Generate response content
+        content = template["prefix"] + prompt[:100] + template["suffix"]
+        
+        # Calculate tokens and cost
+        token_pool = self._token_pool[response_type]
+        if len(token_pool) < MOCK_RANDOM_POOL_LOW_WATER:
+            self._refill_random_pools(response_type)
+        tokens_used = token_pool.popleft()
+        cost = self._cost_pool[response_type].popleft()
+        
+        execution_time = time.time() - start_time
+        
+        # Record call statistics
+        self._record_call(tokens_used, cost, execution_time)
+        
+        return LLMResponse(
+            content=content,
+            tokens_used=tokens_used,
+            cost=cost,
+            execution_time=execution_time,
+            model=self.model,
+            provider=self.provider,
+            metadata={
+                "response_type": response_type,
+                "temperature": temperature,
+                "max_tokens": max_tokens,
+                "system_prompt": system_prompt
+            }
+        )
+    
+    async def generate_chat_response(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.7,
+        max_tokens: int = 2000,
+        **kwargs
+    ) -> LLMResponse:
+        """Generate a mock chat response"""
+        # Extract the last user message as the prompt; it is usually the final one
+        if messages and messages[-1]["role"] == "user":
+            prompt = messages[-1]["content"]
+        else:
+            prompt = next(
+                (m["content"] for m in reversed(messages) if m["role"] == "user"), ""
+            )
+        
+        return await self.generate_response(prompt, None, temperature, max_tokens, **kwargs)
+    
+    def _refill_random_pools(self, response_type: str):
+        """Top up the token and cost pools for a response type"""
+        template = self.response_templates[response_type]
+        token_lo, token_hi = template["tokens_range"]
+        cost_lo, cost_hi = template["cost_range"]
+        size = MOCK_RANDOM_POOL_SIZE
+        if self._rng is not None:
+            tokens = self._rng.integers(token_lo, token_hi + 1, size=size).tolist()
+            costs = self._rng.uniform(cost_lo, cost_hi, size=size).tolist()
+        else:
+            tokens = [random.randint(token_lo, token_hi) for _ in range(size)]
+            costs = [random.uniform(cost_lo, cost_hi) for _ in range(size)]
+        self._token_pool[response_type].extend(tokens)
+        self._cost_pool[response_type].extend(costs)
+    
+    def _determine_response_type(self, prompt: str) -> str:
+        """Determine the type of response based on prompt content"""
+        # One case-insensitive scan over the prompt as given (no lowered copy);
+        # earlier response types take priority
+        best = None
+        for match in _RESPONSE_TYPE_RE.finditer(prompt):
+            priority = _RESPONSE_TYPE_PRIORITY[match.lastgroup]
+            if priority == 0:
+                return match.lastgroup
+            if best is None or priority < best:
+                best = priority
+        
+        return _RESPONSE_TYPE_ORDER[best] if best is not None else "general"
+    
+
+# Provider-specific call and response handling, bound once per RealLLMService
+async def _openai_call(create, model: str, kwargs: Dict[str, Any], timeout: int):
+    # System prompts come first so OpenAI's automatic prefix caching applies
+    return await create(
+        model=model,
+        messages=kwargs["messages"],
+        temperature=kwargs["temperature"],
+        max_tokens=kwargs["max_tokens"],
+        timeout=timeout
+    )
+
+def _anthropic_request(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    """Anthropic request arguments, with system prompts marked for prompt caching"""
+    system = [
+        {"type": "text", "text": m["content"], "cache_control": {"type": "ephemeral"}}
+        for m in kwargs["messages"] if m["role"] == "system"
+    ]
+    request = {
+        "messages": [m for m in kwargs["messages"] if m["role"] != "system"],
+        "temperature": kwargs["temperature"],
+        "max_tokens": kwargs["max_tokens"]
+    }
+    if system:
+        request["system"] = system
+    return request
+
+async def _anthropic_call(create, model: str, kwargs: Dict[str, Any], timeout: int):
+    return await create(model=model, **_anthropic_request(kwargs))
+
+async def _openai_stream(client, model: str, kwargs: Dict[str, Any], timeout: int, usage: Dict[str, Any]):
+    stream = await client.chat.completions.create(
+        model=model,
+        messages=kwargs["messages"],
+        temperature=kwargs["temperature"],
+        max_tokens=kwargs["max_tokens"],
+        timeout=timeout,
+        stream=True,
+        stream_options={"include_usage": True}
+    )
+    async for chunk in stream:
+        if chunk.usage is not None:
+            usage["usage"] = chunk.usage
+        if chunk.choices:
+            delta = chunk.choices[0].delta.content
+            if delta:
+                yield delta
+
+async def _anthropic_stream(client, model: str, kwargs: Dict[str, Any], timeout: int, usage: Dict[str, Any]):
+    async with client.messages.stream(model=model, **_anthropic_request(kwargs)) as stream:
+        async for text in stream.text_stream:
+            yield text
+        final = await stream.get_final_message()
+    usage["usage"] = final.usage
+
+def _openai_content(response) -> str:
+    return response.choices[0].message.content
+
+def _anthropic_content(response) -> str:
+    return response.content[0].text
+
+def _openai_tokens(usage) -> int:
+    return usage.total_tokens
+
+def _anthropic_tokens(usage) -> int:
+    # Anthropic reports prompt-cache reads and writes separately from input_tokens
+    return (
+        usage.input_tokens + usage.output_tokens
+        + (getattr(usage, "cache_read_input_tokens", None) or 0)
+        + (getattr(usage, "cache_creation_input_tokens", None) or 0)
+    )
+
+def _openai_cached_tokens(usage) -> int:
+    details = getattr(usage, "prompt_tokens_details", None)
+    return getattr(details, "cached_tokens", None) or 0
+
+def _anthropic_cached_tokens(usage) -> int:
+    return getattr(usage, "cache_read_input_tokens", None) or 0
+
 class RealLLMService(BaseLLMService):
     """Real LLM service using actual API calls"""
     
@@ -420,27 +602,73 @@ class RealLLMService(BaseLLMService):
         self.max_tokens = settings.llm_max_tokens
         self.timeout = settings.llm_timeout
         self.max_retries = settings.llm_max_retries
+        self.capture_raw_response = settings.capture_raw_response
+        
+        # Bound concurrent provider calls, and let identical concurrent
+        # requests share a single call
+        self._semaphore = asyncio.Semaphore(settings.llm_max_concurrency)
+        self._in_flight: Dict[str, asyncio.Task] = {}
         
         # Import the appropriate client based on provider
         self._initialize_client()
     
     def _initialize_client(self):
-        """Initialize the appropriate LLM client"""
-        if self.provider.lower() == "openai":
-            try:
-                import openai
-                self.client = openai.AsyncOpenAI(api_key=self.api_key)
-            except ImportError:
+        """Initialize the appropriate LLM client and bind its provider handlers"""
+        provider = self.provider.lower()
+        if provider == "openai":
+            if openai is None:
                 raise ImportError("OpenAI package not installed. Run: pip install openai")
-        elif self.provider.lower() == "anthropic":
-            try:
-                import anthropic
-                self.client = anthropic.AsyncAnthropic(api_key=self.api_key)
-            except ImportError:
+            self.client = openai.AsyncOpenAI(api_key=self.api_key, http_client=self._create_http_client())
+            self._create = self.client.chat.completions.create
+            self._call = _openai_call
+            self._stream = _openai_stream
+            self._retryable_errors = (
+                openai.RateLimitError, openai.APIConnectionError,
+                openai.APITimeoutError, openai.InternalServerError
+            )
+            self._extract_content = _openai_content
+            self._count_tokens = _openai_tokens
+            self._count_cached_tokens = _openai_cached_tokens
+            # Simplified pricing (real implementation would use actual pricing)
+            self._cost_per_token = 0.00003 if "gpt-4" in self.model.lower() else 0.00001
+            self._cached_token_discount = 0.5
+        elif provider == "anthropic":
+            if anthropic is None:
                 raise ImportError("Anthropic package not installed. Run: pip install anthropic")
+            self.client = anthropic.AsyncAnthropic(api_key=self.api_key, http_client=self._create_http_client())
+            self._create = self.client.messages.create
+            self._call = _anthropic_call
+            self._stream = _anthropic_stream
+            self._retryable_errors = (
+                anthropic.RateLimitError, anthropic.APIConnectionError,
+                anthropic.APITimeoutError, anthropic.InternalServerError
+            )
+            self._extract_content = _anthropic_content
+            self._count_tokens = _anthropic_tokens
+            self._count_cached_tokens = _anthropic_cached_tokens
+            self._cost_per_token = 0.000015  # $0.015 per 1K tokens
+            self._cached_token_discount = 0.1
         else:
             raise ValueError(f"Unsupported LLM provider: {self.provider}")
     
+    def _create_http_client(self) -> httpx.AsyncClient:
+        """Long-lived pooled HTTP client shared by all calls from this service"""
+        try:
+            import h2  # noqa: F401
+            http2 = True
+        except ImportError:
+            http2 = False
+        
+        return httpx.AsyncClient(
+            limits=httpx.Limits(max_keepalive_connections=32, max_connections=64, keepalive_expiry=90),
+            http2=http2,
+            timeout=httpx.Timeout(self.timeout, connect=10.0)
+        )
+    
+    async def close(self) -> None:
+        """Close the provider client and its connection pool"""
+        await self.client.close()
+    
     async def generate_response(
         self, 
         prompt: str, 
@@ -462,9 +690,13 @@ class RealLLMService(BaseLLMService):
             messages.append({"role": "system", "content": system_prompt})
         messages.append({"role": "user", "content": prompt})
         
+        cached = await self.response_cache.lookup(messages, self.model, temp, max_tok)
+        if cached is not None:
+            return self._cached_response(cached, start_time)
+        
         try:
             # Make API call with retry logic
-            response = await self._make_api_call_with_retry(
+            response = await self._coalesced_api_call(
                 messages=messages,
                 temperature=temp,
                 max_tokens=max_tok,
@@ -473,14 +705,15 @@ class RealLLMService(BaseLLMService):
             
             # Extract content and calculate metrics
             content = self._extract_content(response)
-            tokens_used = self._count_tokens(response)
-            cost = self._calculate_cost(tokens_used)
+            tokens_used = self._count_tokens(response.usage)
+            cached_tokens = self._count_cached_tokens(response.usage)
+            cost = self._calculate_cost(tokens_used, cached_tokens)
             execution_time = time.time() - start_time
             
             # Record call statistics
             self._record_call(tokens_used, cost, execution_time)
             
-            return LLMResponse(
+            llm_response = LLMResponse(
                 content=content,
                 tokens_used=tokens_used,
                 cost=cost,
@@ -491,9 +724,16 @@ class RealLLMService(BaseLLMService):
                     "temperature": temp,
                     "max_tokens": max_tok,
                     "system_prompt": system_prompt,
-                    "raw_response": str(response)
+                    "response_id": getattr(response, "id", None),
+                    "response_model": getattr(response, "model", None),
+                    "cached_prompt_tokens": cached_tokens
                 }
             )
+            if self.capture_raw_response:
+                # Rendering the full provider response is costly, so it is opt-in
+                llm_response.metadata["raw_response"] = str(response)
+            await self.response_cache.store(messages, self.model, temp, max_tok, llm_response)
+            return llm_response
             
         except Exception as e:
             # Handle API errors gracefully
@@ -514,9 +754,13 @@ class RealLLMService(BaseLLMService):
         temp = temperature or self.temperature
         max_tok = max_tokens or self.max_tokens
         
+        cached = await self.response_cache.lookup(messages, self.model, temp, max_tok)
+        if cached is not None:
+            return self._cached_response(cached, start_time)
+        
         try:
             # Make API call with retry logic
-            response = await self._make_api_call_with_retry(
+            response = await self._coalesced_api_call(
                 messages=messages,
                 temperature=temp,
                 max_tokens=max_tok,
@@ -525,14 +769,15 @@ class RealLLMService(BaseLLMService):
             
             # Extract content and calculate metrics
             content = self._extract_content(response)
-            tokens_used = self._count_tokens(response)
-            cost = self._calculate_cost(tokens_used)
+            tokens_used = self._count_tokens(response.usage)
+            cached_tokens = self._count_cached_tokens(response.usage)
+            cost = self._calculate_cost(tokens_used, cached_tokens)
             execution_time = time.time() - start_time
             
             # Record call statistics
             self._record_call(tokens_used, cost, execution_time)
             
-            return LLMResponse(
+            llm_response = LLMResponse(
                 content=content,
                 tokens_used=tokens_used,
                 cost=cost,
@@ -542,102 +787,160 @@ class RealLLMService(BaseLLMService):
                 metadata={
                     "temperature": temp,
                     "max_tokens": max_tok,
-                    "raw_response": str(response)
+                    "response_id": getattr(response, "id", None),
+                    "response_model": getattr(response, "model", None),
+                    "cached_prompt_tokens": cached_tokens
                 }
             )
+            if self.capture_raw_response:
+                # Rendering the full provider response is costly, so it is opt-in
+                llm_response.metadata["raw_response"] = str(response)
+            await self.response_cache.store(messages, self.model, temp, max_tok, llm_response)
+            return llm_response
             
         except Exception as e:
             # Handle API errors gracefully
             error_msg = f"LLM API Error: {str(e)}"
             raise RuntimeError(error_msg)
     
-    async def _make_api_call_with_retry(self, **kwargs):
-        """Make API call with retry logic"""
-        last_error = None
+    async def stream_response(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = None,
+        max_tokens: int = None,
+        **kwargs
+    ) -> AsyncIterator[str]:
+        """Stream response text from the real LLM API as it is generated"""
+        start_time = time.time()
         
-        for attempt in range(self.max_retries):
-            try:
-                if self.provider.lower() == "openai":
-                    return await self.client.chat.completions.create(
-                        model=self.model,
-                        messages=kwargs["messages"],
-                        temperature=kwargs["temperature"],
-                        max_tokens=kwargs["max_tokens"],
-                        timeout=self.timeout
-                    )
-                elif self.provider.lower() == "anthropic":
-                    return await self.client.messages.create(
-                        model=self.model,
-                        messages=kwargs["messages"],
-                        temperature=kwargs["temperature"],
-                        max_tokens=kwargs["max_tokens"]
-                    )
-                    
-            except Exception as e:
-                last_error = e
-                if attempt < self.max_retries - 1:
-                    # Exponential backoff
-                    wait_time = (2 ** attempt) * 1.0
-                    await asyncio.sleep(wait_time)
-                    continue
-                else:
-                    raise last_error
+        # Use defaults if not provided
+        temp = temperature or self.temperature
+        max_tok = max_tokens or self.max_tokens
+        
+        # Prepare messages
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": prompt})
         
-        raise last_error
+        usage: Dict[str, Any] = {"usage": None}
+        request = {"messages": messages, "temperature": temp, "max_tokens": max_tok}
+        try:
+            async with self._semaphore:
+                async for delta in self._stream(self.client, self.model, request, self.timeout, usage):
+                    yield delta
+        except Exception as e:
+            raise RuntimeError(f"LLM API Error: {str(e)}")
+        
+        tokens_used = cached_tokens = 0
+        if usage["usage"] is not None:
+            tokens_used = self._count_tokens(usage["usage"])
+            cached_tokens = self._count_cached_tokens(usage["usage"])
+        self._record_call(tokens_used, self._calculate_cost(tokens_used, cached_tokens), time.time() - start_time)
     
-    def _extract_content(self, response) -> str:
-        """Extract content from API response"""
-        if self.provider.lower() == "openai":
-            return response.choices[0].message.content
-        elif self.provider.lower() == "anthropic":
-            return response.content[0].text
-        else:
-            return str(response)
+    async def _coalesced_api_call(self, **kwargs):
+        """Make an API call, sharing the result with identical in-flight requests"""
+        key = json.dumps(kwargs, sort_keys=True, default=str)
+        task = self._in_flight.get(key)
+        if task is None:
+            # The call runs in its own task, so cancelling any one caller
+            # (including the one that started it) leaves the others waiting
+            task = asyncio.ensure_future(self._limited_api_call(**kwargs))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._finish_in_flight(key, done))
+        return await asyncio.shield(task)
     
-    def _count_tokens(self, response) -> int:
-        """Count tokens used in the response"""
-        if self.provider.lower() == "openai":
-            return response.usage.total_tokens
-        elif self.provider.lower() == "anthropic":
-            # Anthropic doesn't provide token count in response
-            # Estimate based on content length
-            return len(self._extract_content(response)) // 4  # Rough estimate
-        else:
-            return 0
+    def _finish_in_flight(self, key: str, task: asyncio.Task) -> None:
+        """Forget a finished shared call"""
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled():
+            # Mark retrieved so a failure nobody waited for isn't logged as unhandled
+            task.exception()
     
-    def _calculate_cost(self, tokens_used: int) -> float:
-        """Calculate cost based on tokens used"""
-        # Simplified cost calculation (real implementation would use actual pricing)
-        if self.provider.lower() == "openai":
-            if "gpt-4" in self.model.lower():
-                return tokens_used * 0.00003  # $0.03 per 1K tokens
-            else:
-                return tokens_used * 0.00001  # $0.01 per 1K tokens
-        elif self.provider.lower() == "anthropic":
-            return tokens_used * 0.000015  # $0.015 per 1K tokens
-        else:
+    async def _limited_api_call(self, **kwargs):
+        """Make an API call within the concurrency limit"""
+        async with self._semaphore:
+            return await self._make_api_call_with_retry(**kwargs)
+    
+    async def _make_api_call_with_retry(self, **kwargs):
+        """Make API call, retrying transient provider errors"""
+        for attempt in range(self.max_retries):
+            try:
+                return await self._call(self._create, self.model, kwargs, self.timeout)
+                    
+            except self._retryable_errors as e:
+                if attempt >= self.max_retries - 1:
+                    raise
+                # Jittered exponential backoff, but never sooner than the
+                # provider asked for on a 429
+                wait_time = min((2 ** attempt) * (0.5 + random.random()), 30.0)
+                await asyncio.sleep(max(wait_time, self._retry_after(e)))
+    
+    @staticmethod
+    def _retry_after(error: Exception) -> float:
+        """Seconds from a Retry-After header on the error's response, if any"""
+        response = getattr(error, "response", None)
+        if response is None:
             return 0.0
+        try:
+            return float(response.headers.get("retry-after", 0))
+        except ValueError:
+            return 0.0
+    
+    def _calculate_cost(self, tokens_used: int, cached_tokens: int = 0) -> float:
+        """Calculate cost based on tokens used, discounting prompt-cache reads"""
+        return (tokens_used - cached_tokens * (1 - self._cached_token_discount)) * self._cost_per_token
 
 class LLMServiceFactory:
     """Factory for creating LLM service instances"""
     
-    @staticmethod
-    def create_service(use_mock: bool = None) -> BaseLLMService:
-        """Create an LLM service instance"""
+    # Services created so far, keyed by whether they are the mock
+    _instances: Dict[bool, BaseLLMService] = {}
+    
+    @classmethod
+    def create_service(cls, use_mock: bool = None) -> BaseLLMService:
+        """Create an LLM service instance (reused until reset)"""
         if use_mock is None:
             use_mock = settings.use_mock_llm
         
-        if use_mock:
-            return MockLLMService()
-        else:
-            return RealLLMService()
+        service = cls._instances.get(use_mock)
+        if service is None:
+            service = MockLLMService() if use_mock else RealLLMService()
+            cls._instances[use_mock] = service
+        return service
+    
+    @classmethod
+    def reset(cls):
+        """Forget created services so the next call picks up new settings"""
+        # Not closed here: requests already using a dropped service finish on
+        # it, and it is garbage-collected afterwards
+        cls._instances.clear()
     
     @staticmethod
-    def get_service_stats() -> Dict[str, Any]:
+    def _empty_stats(provider: str, model: str) -> Dict[str, Any]:
+        """Stats for a service that has not been created yet"""
+        return {
+            "provider": provider,
+            "model": model,
+            "total_calls": 0,
+            "total_tokens": 0,
+            "total_cost": 0.0,
+            "average_tokens_per_call": 0.0,
+            "average_cost_per_call": 0.0,
+            "last_call_time": None
+        }
+    
+    @classmethod
+    def get_service_stats(cls) -> Dict[str, Any]:
         """Get statistics from all active services"""
-        mock_service = MockLLMService()
+        mock_service = cls._instances.get(True)
         stats = {
-            "mock_service": mock_service.get_stats(),
+            "mock_service": (
+                mock_service.get_stats() if mock_service is not None
+                else cls._empty_stats("mock", "mock-model")
+            ),
             "configuration": {
                 "use_mock_llm": settings.use_mock_llm,
                 "llm_provider": settings.llm_provider,
@@ -649,10 +952,10 @@ class LLMServiceFactory:
         
         # Add real service stats if not using mock
         if not settings.use_mock_llm:
-            try:
-                real_service = RealLLMService()
-                stats["real_service"] = real_service.get_stats()
-            except Exception as e:
-                stats["real_service_error"] = str(e)
+            real_service = cls._instances.get(False)
+            stats["real_service"] = (
+                real_service.get_stats() if real_service is not None
+                else cls._empty_stats(settings.llm_provider, settings.llm_model)
+            )
         
         return stats
\ No newline at end of file
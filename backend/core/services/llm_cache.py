@@ -0,0 +1,225 @@
+"""
+Response cache for LLM services
+Exact-match lookups by request hash, plus optional embedding-similarity
+lookups when sentence-transformers is installed
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+import hashlib
+import json
+import logging
+import threading
+
+from utils.helpers import run_in_thread
+
+logger = logging.getLogger(__name__)
+
+# Scope matrices grow in chunks of this many rows instead of one copy per store
+_SCOPE_CHUNK_ROWS = 16
+
+class _Scope:
+    """Embedding rows and responses for one scope, capped as a ring buffer"""
+
+    __slots__ = ("matrix", "responses", "count", "next")
+
+    def __init__(self):
+        self.matrix = None
+        self.responses: List[Any] = []
+        self.count = 0
+        self.next = 0  # row to overwrite once the scope is full
+
+    def add(self, embedding, response: Any, max_rows: int) -> None:
+        import numpy as np
+
+        if self.matrix is None:
+            self.matrix = np.empty((min(_SCOPE_CHUNK_ROWS, max_rows), embedding.shape[0]), dtype=embedding.dtype)
+        if self.count < max_rows:
+            if self.count == len(self.matrix):
+                grown = np.empty((min(len(self.matrix) * 2, max_rows), self.matrix.shape[1]), dtype=self.matrix.dtype)
+                grown[:self.count] = self.matrix
+                self.matrix = grown
+            row = self.count
+            self.count += 1
+            self.responses.append(response)
+        else:
+            # Full: overwrite the oldest row
+            row = self.next
+            self.next = (self.next + 1) % max_rows
+            self.responses[row] = response
+        self.matrix[row] = embedding
+
+class SemanticCache:
+    """Cache of LLM responses keyed by request, with near-duplicate prompt matching"""
+
+    def __init__(
+        self,
+        similarity_threshold: float = 0.92,
+        max_temperature: float = 0.3,
+        max_entries: int = 1024,
+        max_scopes: int = 256,
+        max_scope_rows: int = 256,
+        embedding_model: str = "all-MiniLM-L6-v2"
+    ):
+        self.similarity_threshold = similarity_threshold
+        self.max_temperature = max_temperature
+        self.max_entries = max_entries
+        self.max_scopes = max_scopes
+        self.max_scope_rows = max_scope_rows
+        self.embedding_model = embedding_model
+
+        self._exact: "OrderedDict[str, Any]" = OrderedDict()
+
+        # Per-scope embeddings (L2-normalized rows) and responses, least recently
+        # used first; a scope is everything but the final prompt
+        self._scopes: "OrderedDict[str, _Scope]" = OrderedDict()
+
+        self._encoder = None
+        self._encoder_unavailable = False
+        self._encoder_lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _hash(payload: Any) -> str:
+        """Stable SHA256 of a JSON-serializable payload"""
+        data = json.dumps(payload, sort_keys=True, default=str)
+        return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+    def _keys(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        temperature: float,
+        max_tokens: Optional[int]
+    ) -> Tuple[str, str]:
+        """Exact-match key for the whole request and scope key for similarity lookups"""
+        exact_key = self._hash([model, temperature, max_tokens, messages])
+        scope_key = self._hash([model, temperature, max_tokens, messages[:-1]])
+        return exact_key, scope_key
+
+    def _get_encoder(self):
+        """Load the sentence-transformers model on first use, if available (blocking)"""
+        with self._encoder_lock:
+            if self._encoder is None and not self._encoder_unavailable:
+                try:
+                    from sentence_transformers import SentenceTransformer
+                    self._encoder = SentenceTransformer(self.embedding_model)
+                except ImportError:
+                    # Exact-match caching only
+                    self._encoder_unavailable = True
+                except Exception as e:
+                    # e.g. the model download failed; don't retry on every call
+                    logger.warning("Semantic cache disabled, could not load %s: %s", self.embedding_model, e)
+                    self._encoder_unavailable = True
+        return self._encoder
+
+    def _encode(self, text: str):
+        """Normalized embedding of text, or None when no encoder is available (blocking)"""
+        encoder = self._get_encoder()
+        if encoder is None:
+            return None
+        return encoder.encode([text], normalize_embeddings=True)[0]
+
+    async def _embed(self, text: str):
+        """Embedding of text computed off the event loop; None if unavailable or failed"""
+        if self._encoder_unavailable:
+            return None
+        try:
+            return await run_in_thread(self._encode, text)
+        except Exception as e:
+            logger.warning("Semantic cache embedding failed: %s", e)
+            return None
+
+    def is_cacheable(self, temperature: float) -> bool:
+        """Only near-deterministic requests are cached"""
+        return temperature <= self.max_temperature
+
+    async def lookup(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        temperature: float,
+        max_tokens: Optional[int] = None
+    ) -> Optional[Any]:
+        """Return a cached response for an equivalent request, if any"""
+        if not messages or not self.is_cacheable(temperature):
+            return None
+
+        exact_key, scope_key = self._keys(messages, model, temperature, max_tokens)
+        response = self._exact.get(exact_key)
+        if response is not None:
+            self._exact.move_to_end(exact_key)
+            self.hits += 1
+            return response
+
+        # temperature 0 requests are matched exactly only
+        scope = self._scopes.get(scope_key)
+        if temperature > 0 and scope is not None:
+            query = await self._embed(messages[-1]["content"])
+            if query is not None:
+                scores = scope.matrix[:scope.count] @ query
+                best = int(scores.argmax())
+                if scores[best] >= self.similarity_threshold:
+                    if scope_key in self._scopes:
+                        self._scopes.move_to_end(scope_key)
+                    self.hits += 1
+                    return scope.responses[best]
+
+        self.misses += 1
+        return None
+
+    async def store(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        temperature: float,
+        max_tokens: Optional[int],
+        response: Any
+    ) -> None:
+        """Cache a response for later equivalent requests"""
+        if not messages or not self.is_cacheable(temperature):
+            return
+
+        exact_key, scope_key = self._keys(messages, model, temperature, max_tokens)
+        self._exact[exact_key] = response
+        self._exact.move_to_end(exact_key)
+        if len(self._exact) > self.max_entries:
+            self._exact.popitem(last=False)
+
+        if temperature <= 0:
+            return
+        embedding = await self._embed(messages[-1]["content"])
+        if embedding is None:
+            return
+
+        scope = self._scopes.get(scope_key)
+        if scope is None:
+            scope = self._scopes[scope_key] = _Scope()
+            if len(self._scopes) > self.max_scopes:
+                # Drop the least recently used scope
+                self._scopes.popitem(last=False)
+        else:
+            self._scopes.move_to_end(scope_key)
+        scope.add(embedding, response, self.max_scope_rows)
+
+    def clear(self) -> None:
+        """Drop all cached responses"""
+        self._exact.clear()
+        self._scopes.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Cache statistics"""
+        return {
+            "entries": len(self._exact),
+            "scopes": len(self._scopes),
+            "hits": self.hits,
+            "misses": self.misses,
+            "semantic_enabled": self._encoder is not None
+        }
+
+# Shared cache instance for all LLM services
+llm_response_cache = SemanticCache()
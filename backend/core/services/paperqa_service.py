@@ -1,21 +1,309 @@
-print("--- Importing: core.paperqa_service ---")
 # core/paperqa_service.py
 import asyncio
+import json
+import logging
+import mmap
 import pickle
 from pathlib import Path
 import os
 import re
-from typing import Dict, Any
+import time
+from bisect import bisect_right
+from functools import lru_cache
+from itertools import accumulate
+from collections import OrderedDict
+from typing import Dict, Any, AsyncIterator, List, Optional, Tuple
 
+import numpy as np
 from paperqa import Docs
 from core.utils import get_local_llm_settings
 from core.collections_manager import CollectionsManager
+from utils.helpers import run_in_thread
+
+logger = logging.getLogger(__name__)
 
 # --- Global PaperQA Configuration (base settings) ---
 
 llm_model = "ollama/gemma3:4b"
 embedding_model = "ollama/nomic-embed-text:latest"
 
+# --- Precompiled patterns for citation linking ---
+
+_URL_RE = re.compile(r'https?://[^\s,]+')
+_ARXIV_RE = re.compile(r'arXiv:(\d{4}\.\d{4,5})')
+_CITATION_AUTHOR_RE = re.compile(r'^([^,]+)')
+_CITATION_YEAR_RE = re.compile(r'(\d{4})')
+_CITATION_SEPARATOR = "\x1f"
+
+@lru_cache(maxsize=4096)
+def _compile_citation_re(author: str, year: str) -> re.Pattern:
+    """Flexible pattern for in-text citations like (Author et al., Year)"""
+    return re.compile(f"\\(.*?{re.escape(author)}[^)]*?{re.escape(year)}.*?\\)")
+
+@lru_cache(maxsize=256)
+def _compile_question_re(question: str) -> re.Pattern:
+    """Pattern matching a line that repeats the question, with an optional "Question: " prefix"""
+    return re.compile(r"^\s*(Question:\s*)?" + re.escape(question) + r"\s*$", re.IGNORECASE | re.MULTILINE)
+
+# --- Docs cache loading ---
+# The pickled Docs is split on first load into a small metadata pickle, an
+# embedding matrix, and a file of any other pickle protocol 5 out-of-band
+# buffers (numpy arrays). Later loads memory-map the matrix and the buffers
+# instead of copying them out of the pickle stream. These files sit next to
+# the Docs pickle and are gitignored.
+
+_BUFFER_ALIGNMENT = 64
+
+def _split_cache_paths(cache_file_path: Path):
+    """Paths of the metadata pickle, embedding matrix and buffer file next to a Docs pickle"""
+    return (
+        cache_file_path.with_suffix(".meta.pkl"),
+        cache_file_path.with_suffix(".embeddings.npy"),
+        cache_file_path.with_suffix(".buffers.bin"),
+    )
+
+def _temp_path(path: Path) -> Path:
+    """Sibling path to write to before atomically replacing path"""
+    return path.with_name(path.name + ".tmp")
+
+def _dump_out_of_band(obj, meta_file, buffers_path: Path) -> None:
+    """Pickle obj with protocol 5, writing its raw buffers to buffers_path.
+    meta_file gets the (offset, length) of each buffer followed by the pickle."""
+    buffers = []
+    data = pickle.dumps(obj, protocol=5, buffer_callback=buffers.append)
+    spans = []
+    with open(buffers_path, "wb") as f:
+        for buffer in buffers:
+            raw = buffer.raw()
+            f.write(b"\0" * (-f.tell() % _BUFFER_ALIGNMENT))
+            spans.append((f.tell(), raw.nbytes))
+            f.write(raw)
+    pickle.dump(spans, meta_file, protocol=5)
+    meta_file.write(data)
+
+def _load_out_of_band(meta_file, buffers_path: Path):
+    """Inverse of _dump_out_of_band; buffers are read-only views of a memory map"""
+    spans = pickle.load(meta_file)
+    if not spans:
+        return pickle.load(meta_file)
+    with open(buffers_path, "rb") as f:
+        mapped = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+    return pickle.load(meta_file, buffers=(mapped[offset:offset + length] for offset, length in spans))
+
+def _write_split_cache(docs: Docs, cache_file_path: Path) -> None:
+    """Save docs as metadata pickle + embedding matrix (best effort)"""
+    meta_path, embeddings_path, buffers_path = _split_cache_paths(cache_file_path)
+    embeddings = [text_obj.embedding for text_obj in docs.texts]
+    if not embeddings or any(embedding is None for embedding in embeddings):
+        return
+
+    temp_paths = [_temp_path(path) for path in (embeddings_path, buffers_path, meta_path)]
+    try:
+        # The metadata pickle marks the split cache as fresh, so drop it first
+        # and put it in place last; a crash in between leaves no split cache
+        meta_path.unlink(missing_ok=True)
+        # Keeps the embeddings' own dtype (float lists load as float64)
+        matrix = np.asarray(embeddings)
+        with open(temp_paths[0], "wb") as f:
+            np.save(f, matrix)
+        # Pickle everything but the vectors, then put the vectors back
+        for text_obj in docs.texts:
+            text_obj.embedding = None
+        try:
+            with open(temp_paths[2], "wb") as f:
+                _dump_out_of_band(docs, f, temp_paths[1])
+        finally:
+            for text_obj, embedding in zip(docs.texts, embeddings):
+                text_obj.embedding = embedding
+        for temp_path, path in zip(temp_paths, (embeddings_path, buffers_path, meta_path)):
+            os.replace(temp_path, path)
+    except Exception as e:
+        logger.warning("Could not write split PaperQA cache: %s", e)
+        for temp_path in temp_paths:
+            temp_path.unlink(missing_ok=True)
+
+def _load_split_cache(cache_file_path: Path):
+    """Load docs from the split cache if it is up to date, else None"""
+    meta_path, embeddings_path, buffers_path = _split_cache_paths(cache_file_path)
+    try:
+        if meta_path.stat().st_mtime < cache_file_path.stat().st_mtime:
+            return None
+    except OSError:
+        # Not split yet
+        return None
+
+    try:
+        with open(meta_path, "rb") as f:
+            docs = _load_out_of_band(f, buffers_path)
+        matrix = np.load(embeddings_path, mmap_mode="r")
+        if len(matrix) != len(docs.texts):
+            return None
+        # Each embedding is a read-only row of the mapped file, not a copy
+        for text_obj, row in zip(docs.texts, matrix):
+            text_obj.embedding = row
+    except (OSError, EOFError, pickle.UnpicklingError, ValueError) as e:
+        # Damaged or stale split cache: fall back to the full pickle
+        logger.warning("Ignoring split PaperQA cache for %s: %s", cache_file_path, e)
+        return None
+    return docs
+
+def _load_docs(cache_file_path: Path) -> Docs:
+    """Load a Docs cache, preferring the memory-mapped split format"""
+    docs = _load_split_cache(cache_file_path)
+    if docs is None:
+        with open(cache_file_path, "rb") as f:
+            docs = pickle.load(f)
+        _write_split_cache(docs, cache_file_path)
+    return docs
+
+def _build_citation_links(docs: Docs) -> Dict[str, str]:
+    """Map each document citation string to a URL or arXiv link, where one is found"""
+    citations = {}
+    for text_obj in docs.texts:
+        citation_text = getattr(getattr(text_obj, "doc", None), "citation", None)
+        if citation_text and isinstance(citation_text, str):
+            citations[citation_text] = None
+    citations = list(citations)
+
+    # Scan all citations at once; the separator is whitespace, so no match
+    # crosses into the next citation. Offsets map matches back to citations.
+    joined = _CITATION_SEPARATOR.join(citations)
+    starts = list(accumulate((len(citation) + 1 for citation in citations[:-1]), initial=0))
+
+    def first_matches(pattern: re.Pattern) -> Dict[int, re.Match]:
+        found = {}
+        for match in pattern.finditer(joined):
+            found.setdefault(bisect_right(starts, match.start()) - 1, match)
+        return found
+
+    url_matches = first_matches(_URL_RE)
+    arxiv_matches = first_matches(_ARXIV_RE)
+
+    citation_to_link_map = {}
+    for index, citation_text in enumerate(citations):
+        # 1. Prefer a direct URL in the citation string
+        url_match = url_matches.get(index)
+        if url_match:
+            # Clean trailing characters like periods or commas
+            citation_to_link_map[citation_text] = url_match.group(0).rstrip('.,')
+
+        # 2. If no URL, fall back to an arXiv ID
+        elif index in arxiv_matches:
+            arxiv_id = arxiv_matches[index].group(1)
+            citation_to_link_map[citation_text] = f"https://arxiv.org/abs/{arxiv_id}"
+    return citation_to_link_map
+
+def _citation_keys(citation_to_link_map: Dict[str, str]) -> Dict[str, List[str]]:
+    """Parallel author / year / link lists, one entry per distinct (author, year)"""
+    by_key: Dict[Tuple[str, str], str] = {}
+    for full_citation, link in citation_to_link_map.items():
+        # Extract author (everything before the first comma) and year for a more robust match
+        author_match = _CITATION_AUTHOR_RE.search(full_citation)
+        year_match = _CITATION_YEAR_RE.search(full_citation)
+        if author_match and year_match:
+            key = (author_match.group(1).strip(), year_match.group(1).strip())
+            # Keep the last link at its last position, so it still wins overlapping matches
+            by_key.pop(key, None)
+            by_key[key] = link
+    return {
+        "authors": [author for author, _ in by_key],
+        "years": [year for _, year in by_key],
+        "links": list(by_key.values()),
+    }
+
+def _load_citation_keys(docs: Docs, cache_file_path: Path) -> Dict[str, List[str]]:
+    """Citation keys from the sidecar next to the cache, rebuilt if missing or stale"""
+    links_path = cache_file_path.with_name("citation_links.json")
+    try:
+        if links_path.stat().st_mtime >= cache_file_path.stat().st_mtime:
+            keys = json.loads(links_path.read_text(encoding="utf-8"))
+            if "authors" in keys:
+                return keys
+    except (OSError, ValueError):
+        pass
+
+    keys = _citation_keys(_build_citation_links(docs))
+    try:
+        links_path.write_text(json.dumps(keys), encoding="utf-8")
+    except OSError as e:
+        logger.warning("Could not write citation links to %s: %s", links_path, e)
+    return keys
+
+# Parallel lists: authors, in-text citation patterns, links
+CitationMatchers = Tuple[List[str], List[re.Pattern], List[str]]
+
+def _build_citation_matchers(keys: Dict[str, List[str]]) -> CitationMatchers:
+    """Compile the in-text citation pattern for each (author, year) key"""
+    patterns = [_compile_citation_re(author, year) for author, year in zip(keys["authors"], keys["years"])]
+    return keys["authors"], patterns, keys["links"]
+
+# Cache file paths known to exist: collection name -> (path, time last checked)
+_COLLECTIONS_DIR = Path("data/collections")
+_CACHE_PATHS: Dict[str, Tuple[Path, float]] = {}
+_CACHE_PATH_TTL = 5.0  # seconds
+
+def _cache_path(collection_name: str) -> Path:
+    """Location of a collection's PaperQA cache file (whether or not it exists)"""
+    return _COLLECTIONS_DIR / collection_name / "paperqa_cache.pkl"
+
+def _existing_cache_file(collection_name: str) -> Optional[Path]:
+    """Path of the collection's cache file if it exists, re-checked at most every few seconds"""
+    now = time.monotonic()
+    cached = _CACHE_PATHS.get(collection_name)
+    if cached is not None and now - cached[1] < _CACHE_PATH_TTL:
+        return cached[0]
+
+    cache_file_path = _cache_path(collection_name)
+    if not cache_file_path.exists():
+        _CACHE_PATHS.pop(collection_name, None)
+        return None
+    _CACHE_PATHS[collection_name] = (cache_file_path, now)
+    return cache_file_path
+
+# Recently used collections: name -> (cache file mtime, docs, citation matchers)
+_DOCS_CACHE: "OrderedDict[str, Tuple[float, Docs, CitationMatchers]]" = OrderedDict()
+_DOCS_CACHE_SIZE = 8
+# One lock per collection, so a cold load only holds up callers of that collection
+_DOCS_CACHE_LOCKS: Dict[str, asyncio.Lock] = {}
+
+def _cached_docs_entry(collection_name: str, mtime: float) -> Optional[Tuple[Docs, CitationMatchers]]:
+    """Cached docs and matchers for a collection if they match the cache file's mtime"""
+    entry = _DOCS_CACHE.get(collection_name)
+    if entry is None or entry[0] != mtime:
+        return None
+    _DOCS_CACHE.move_to_end(collection_name)
+    return entry[1], entry[2]
+
+async def _get_cached_docs(collection_name: str, cache_file_path: Path) -> Tuple[Docs, CitationMatchers]:
+    """Docs and citation matchers for a collection, reloaded only when the cache file changes"""
+    mtime = cache_file_path.stat().st_mtime
+    # Warm hits don't take any lock
+    cached = _cached_docs_entry(collection_name, mtime)
+    if cached is not None:
+        return cached
+
+    lock = _DOCS_CACHE_LOCKS.get(collection_name)
+    if lock is None:
+        lock = _DOCS_CACHE_LOCKS[collection_name] = asyncio.Lock()
+    async with lock:
+        # Another caller may have loaded it while we waited
+        cached = _cached_docs_entry(collection_name, mtime)
+        if cached is not None:
+            return cached
+
+        # Loading can take seconds for large collections; keep it off the event loop
+        logger.debug("Loading PaperQA cache from: %s", cache_file_path)
+        docs = await run_in_thread(_load_docs, cache_file_path)
+        logger.debug("Cache loaded successfully. Contains %d documents.", len(docs.docs))
+        citation_keys = await run_in_thread(_load_citation_keys, docs, cache_file_path)
+        citation_matchers = _build_citation_matchers(citation_keys)
+
+        _DOCS_CACHE[collection_name] = (mtime, docs, citation_matchers)
+        _DOCS_CACHE.move_to_end(collection_name)
+        while len(_DOCS_CACHE) > _DOCS_CACHE_SIZE:
+            _DOCS_CACHE.popitem(last=False)
+        return docs, citation_matchers
+
 # --- Lazy Service Initializer ---
 my_settings = None
 collections_manager = None
@@ -24,123 +312,170 @@ def _initialize_paperqa_services():
     """Lazily initializes and returns service instances for PaperQA."""
     global my_settings, collections_manager
     if my_settings is None:
-        print("--- Initializing PaperQA LLM settings ---")
+        logger.info("Initializing PaperQA LLM settings")
         my_settings = get_local_llm_settings(llm_model, embedding_model)
     if collections_manager is None:
-        print("--- Initializing CollectionsManager ---")
+        logger.info("Initializing CollectionsManager")
         collections_manager = CollectionsManager()
 
 
 class PaperQAService:
-    async def query_documents(
-        self, collection_name: str, question: str
-    ) -> Dict[str, Any]:
-        """
-        Queries a pre-built PaperQA cache for a given collection.
-        It loads a Docs object from a pickle file and uses it to answer a question.
-        Returns a dictionary with 'answer_text', 'formatted_evidence', and 'error'.
-        """
+    def __init__(self):
+        # Identical concurrent questions against the same collection share one query
+        self._in_flight: Dict[Tuple[str, str], asyncio.Task] = {}
+
+    async def _coalesced_aquery(self, collection_name: str, docs: Docs, question: str):
+        """docs.aquery, sharing the result with an identical query already in flight"""
+        key = (collection_name, question)
+        task = self._in_flight.get(key)
+        if task is None:
+            # Own task, so cancelling one caller doesn't cancel the others
+            task = asyncio.ensure_future(docs.aquery(question, settings=my_settings))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._finish_in_flight(key, done))
+        return await asyncio.shield(task)
+
+    def _finish_in_flight(self, key: Tuple[str, str], task: asyncio.Task) -> None:
+        """Forget a finished shared query"""
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled():
+            # Mark retrieved so a failure nobody waited for isn't logged as unhandled
+            task.exception()
+
+    def _resolve_cache_file(self, collection_name: str) -> Tuple[Optional[Path], Optional[str]]:
+        """Path of a collection's PaperQA cache file, or an error message"""
         _initialize_paperqa_services()
 
         if not collection_name:
-            error_msg = "No collection name provided."
-            return {"answer_text": "", "formatted_evidence": "", "error": error_msg}
+            return None, "No collection name provided."
         
         collection = collections_manager.get_collection(collection_name)
         if not collection:
-            error_msg = f"Collection with ID '{collection_name}' not found."
-            return {"answer_text": "", "formatted_evidence": "", "error": error_msg}
+            return None, f"Collection with ID '{collection_name}' not found."
         
-        collection_name = collection.name
+        cache_file_path = _existing_cache_file(collection.name)
+        if cache_file_path is None:
+            cache_file_path = _cache_path(collection.name)
+            error_msg = f"Cache file not found at {cache_file_path}. Please build the cache for this collection first."
+            logger.warning(error_msg)
+            return None, error_msg
+        return cache_file_path, None
 
-        try:
-            # 1. Define path to the cache file
-            cache_file_path = Path("data/collections") / collection_name / "paperqa_cache.pkl"
+    @staticmethod
+    def _format_answer(response, question: str, citation_matchers: CitationMatchers) -> str:
+        """Final answer text: repeated question removed and citations turned into links"""
+        answer_text = response.formatted_answer if response and response.formatted_answer else "No answer found by PaperQA."
+        
+        # HACK: The formatted_answer sometimes includes the question. We strip it here.
+        # Final attempt: A more aggressive regex approach to remove the question
+        # This regex looks for an optional "Question: " prefix and then the question text,
+        # ignoring leading/trailing whitespace and case. It removes the entire line.
+        pattern = _compile_question_re(question.strip())
+        answer_text = pattern.sub('', answer_text).strip()
+
+        # --- Definitive Link Replacement: Two-Stage Find and Replace ---
 
-            if not cache_file_path.exists():
-                error_msg = f"Cache file not found at {cache_file_path}. Please build the cache for this collection first."
-                print(error_msg)
+        # Stage 1: Find all potential citations in the text and map them to links
+        citations_to_replace = {}
+        # Every in-text citation is parenthesized; without a "(" nothing can match
+        if "(" not in answer_text:
+            citation_matchers = ((), (), ())
+        for author, citation_pattern, link in zip(*citation_matchers):
+            # A citation can only match if its author appears literally, so a
+            # C-level substring test skips the regex for most documents
+            if author not in answer_text:
+                continue
+            for match in citation_pattern.finditer(answer_text):
+                # Store the exact text that was matched and its corresponding link
+                citations_to_replace[match.group(0)] = link
+
+        # Stage 2: Replace the found citations with markdown links in one pass
+        # (longest first, so a citation never shadows one that contains it)
+        if citations_to_replace:
+            replace_pattern = re.compile("|".join(
+                re.escape(text) for text in sorted(citations_to_replace, key=len, reverse=True)
+            ))
+            answer_text = replace_pattern.sub(
+                lambda match: f"[{match.group(0)}]({citations_to_replace[match.group(0)]})",
+                answer_text
+            )
+        return answer_text
+
+    async def query_documents(
+        self, collection_name: str, question: str
+    ) -> Dict[str, Any]:
+        """
+        Queries a pre-built PaperQA cache for a given collection.
+        It loads a Docs object from a pickle file and uses it to answer a question.
+        Returns a dictionary with 'answer_text', 'formatted_evidence', and 'error'.
+        """
+        try:
+            # 1. Find the cache file for the collection
+            cache_file_path, error_msg = self._resolve_cache_file(collection_name)
+            if error_msg:
                 return {"answer_text": "", "formatted_evidence": "", "error": error_msg}
 
-            # 2. Load the Docs object from the pickle file
-            print(f"Loading PaperQA cache from: {cache_file_path}")
-            with open(cache_file_path, "rb") as f:
-                docs = pickle.load(f)
-            print(f"Cache loaded successfully. Contains {len(docs.docs)} documents.")
-
-            # Create a map from citation string to its link
-            citation_to_link_map = {}
-            for text_obj in docs.texts:
-                try:
-                    doc = text_obj.doc
-                    citation_text = doc.citation
-                    link = None
-
-                    # 1. Try to find a direct URL in the citation string
-                    url_match = re.search(r'https?://[^\s,]+', citation_text)
-                    if url_match:
-                        # Clean trailing characters like periods or commas
-                        link = url_match.group(0).rstrip('.,')
-
-                    # 2. If no URL, try to find an arXiv ID
-                    elif 'arXiv:' in citation_text:
-                        arxiv_match = re.search(r'arXiv:(\d{4}\.\d{4,5})', citation_text)
-                        if arxiv_match:
-                            arxiv_id = arxiv_match.group(1)
-                            link = f"https://arxiv.org/abs/{arxiv_id}"
-
-                    # 3. If a link was found, add it to the map for replacement later
-                    if link:
-                        citation_to_link_map[citation_text] = link
-                except Exception as e:
-                    print(f"Could not create link for a document: {e}")
+            # 2. Load the Docs object (and its citation links) from the cache
+            docs, citation_matchers = await _get_cached_docs(cache_file_path.parent.name, cache_file_path)
 
             # 3. Ask the question using the loaded docs and settings
-            print(f"Querying PaperQA with: '{question}'")
-            response = await docs.aquery(question, settings=my_settings)
-            print("PaperQA query finished.")
-
-            answer_text = response.formatted_answer if response and response.formatted_answer else "No answer found by PaperQA."
-            
-            # HACK: The formatted_answer sometimes includes the question. We strip it here.
-            # Final attempt: A more aggressive regex approach to remove the question
-            stripped_question = re.escape(question.strip())
-            # This regex looks for an optional "Question: " prefix and then the question text,
-            # ignoring leading/trailing whitespace and case. It removes the entire line.
-            pattern = re.compile(r"^\s*(Question:\s*)?" + stripped_question + r"\s*$", re.IGNORECASE | re.MULTILINE)
-            answer_text = pattern.sub('', answer_text).strip()
-
-            # --- Definitive Link Replacement: Two-Stage Find and Replace ---
-
-            # Stage 1: Find all potential citations in the text and map them to links
-            citations_to_replace = {}
-            for full_citation, link in citation_to_link_map.items():
-                # Extract author (everything before the first comma) and year for a more robust match
-                author_match = re.search(r'^([^,]+)', full_citation)
-                year_match = re.search(r'(\d{4})', full_citation)
-
-                if author_match and year_match:
-                    author = author_match.group(1).strip()
-                    year = year_match.group(1).strip()
-                    
-                    # Flexible regex to find citations like (Author et al., Year)
-                    citation_pattern = re.compile(f"\\(.*?{re.escape(author)}[^)]*?{re.escape(year)}.*?\\)")
-                    
-                    for match in citation_pattern.finditer(answer_text):
-                        # Store the exact text that was matched and its corresponding link
-                        citations_to_replace[match.group(0)] = link
-
-            # Stage 2: Replace the found citations with markdown links
-            for text, link in citations_to_replace.items():
-                answer_text = answer_text.replace(text, f"[{text}]({link})")
+            logger.debug("Querying PaperQA with: '%s'", question)
+            response = await self._coalesced_aquery(cache_file_path.parent.name, docs, question)
+            logger.debug("PaperQA query finished.")
 
+            answer_text = self._format_answer(response, question, citation_matchers)
             return {"answer_text": answer_text, "context": response.context, "error": None}
 
         except Exception as e:
             error_message = f"Error during PaperQA processing: {str(e)}"
-            print(error_message)
+            logger.error(error_message)
             return {"answer_text": "", "formatted_evidence": "", "error": error_message} 
 
+    async def query_documents_stream(
+        self, collection_name: str, question: str
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streaming variant of query_documents.
+        Yields {'type': 'token', 'text': ...} events as the answer is generated, then a
+        final {'type': 'answer', ...} event with the post-processed answer, or an
+        {'type': 'error', 'error': ...} event.
+        """
+        try:
+            cache_file_path, error_msg = self._resolve_cache_file(collection_name)
+            if error_msg:
+                yield {"type": "error", "error": error_msg}
+                return
+
+            docs, citation_matchers = await _get_cached_docs(cache_file_path.parent.name, cache_file_path)
+
+            # PaperQA calls back with each chunk of the answer as it is generated
+            chunks: asyncio.Queue = asyncio.Queue()
+            logger.debug("Streaming PaperQA query: '%s'", question)
+            query_task = asyncio.create_task(
+                docs.aquery(question, settings=my_settings, callbacks=[chunks.put_nowait])
+            )
+            try:
+                while not query_task.done() or not chunks.empty():
+                    get_chunk = asyncio.ensure_future(chunks.get())
+                    done, _ = await asyncio.wait({get_chunk, query_task}, return_when=asyncio.FIRST_COMPLETED)
+                    if get_chunk in done:
+                        yield {"type": "token", "text": get_chunk.result()}
+                    else:
+                        get_chunk.cancel()
+                response = query_task.result()
+            finally:
+                query_task.cancel()
+            logger.debug("PaperQA streaming query finished.")
+
+            answer_text = self._format_answer(response, question, citation_matchers)
+            yield {"type": "answer", "answer_text": answer_text, "context": response.context, "error": None}
+
+        except Exception as e:
+            error_message = f"Error during PaperQA processing: {str(e)}"
+            logger.error(error_message)
+            yield {"type": "error", "error": error_message}
+
 
 # Global instance
 paperqa_service = PaperQAService() 
\ No newline at end of file
@@ -1,5 +1,6 @@
 from paperqa import Settings
 from paperqa.settings import AgentSettings, IndexSettings
+from functools import lru_cache
 import os
 
 llm_model = "ollama/gemma3:4b"
@@ -7,7 +8,12 @@ llm_model = "ollama/gemma3:4b"
 
 #llm_model = "ollama/gemma3:4b"
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INDEX_DIRECTORY = os.path.join(PROJECT_ROOT, "data", "indexes")
+PAPER_DIRECTORY = os.path.join(PROJECT_ROOT, "data", "papers")
+MANIFEST_FILE = os.path.join(PROJECT_ROOT, "data", "papers_manifest", "generated_manifest.csv")
 
+# Settings are built once per model pair and shared; callers must not mutate them
+@lru_cache(maxsize=8)
 def get_local_llm_settings(llm_model, embedding_model) -> Settings:
     # This is the prompt that was causing the question to be repeated.
     # By defining our own, we can control the output format.
@@ -47,15 +53,15 @@ def get_local_llm_settings(llm_model, embedding_model) -> Settings:
             agent_llm=llm_model, 
             agent_config=local_llm_config,
             index = IndexSettings(
-                index_directory=os.path.join(PROJECT_ROOT, "data", "indexes"),
-                paper_directory=os.path.join(PROJECT_ROOT, "data", "papers"),
-                manifest_file=os.path.join(PROJECT_ROOT, "data", "papers_manifest", "generated_manifest.csv"),
+                index_directory=INDEX_DIRECTORY,
+                paper_directory=PAPER_DIRECTORY,
+                manifest_file=MANIFEST_FILE,
             ),
         ),
 
-        index_directory=os.path.join(PROJECT_ROOT, "data", "indexes"),
-        paper_directory=os.path.join(PROJECT_ROOT, "data", "papers"),
-        manifest_file=os.path.join(PROJECT_ROOT, "data", "papers_manifest", "generated_manifest.csv"),
+        index_directory=INDEX_DIRECTORY,
+        paper_directory=PAPER_DIRECTORY,
+        manifest_file=MANIFEST_FILE,
 
     )
     return my_settings
@@ -6,6 +6,7 @@ Main application entry point
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+from fastapi.responses import JSONResponse, ORJSONResponse
 import uvicorn
 import os
 import logging
@@ -20,9 +21,16 @@ logging.basicConfig(
     ]
 )
 
+# Prefer orjson for response encoding when it is installed
+try:
+    import orjson  # noqa: F401
+    DefaultResponseClass = ORJSONResponse
+except ImportError:
+    DefaultResponseClass = JSONResponse
+
 # Import API routers
 from api.v1.endpoints import agents, executions, workflows, documents, chat, optimization, health, idea_missions
-from core.dependencies import get_service_stats, update_llm_service_config, get_settings
+from core.dependencies import get_service_stats, update_llm_service_config, get_settings, close_services
 
 # Create FastAPI app
 app = FastAPI(
@@ -30,7 +38,8 @@ app = FastAPI(
     description="Backend API for AI Research Assistant with agent orchestration",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=DefaultResponseClass
 )
 
 # Configure CORS for frontend development
@@ -123,6 +132,8 @@ async def startup_event():
 async def shutdown_event():
     """Cleanup on shutdown"""
     print("🛑 AI Research Assistant API shutting down...")
+    await close_services()
+    await idea_missions.close_internal_client()
 
 if __name__ == "__main__":
     # Configuration
@@ -0,0 +1,23 @@
+import pytest
+
+from core.services.chat_intents import match_intent
+
+
+@pytest.mark.parametrize("message, expected", [
+    ("Hi there", "greet"),
+    ("That was helpful", "help"),
+    ("I am researching transformers", "research"),
+    ("Analysing the results", "research"),
+    ("Writing the introduction", "write"),
+    ("We are planning next quarter", "plan"),
+    ("Which strategies work best?", "plan"),
+    ("Reviewing the paper", "review"),
+    # Greetings must be whole words
+    ("A high level summary of this", None),
+])
+def test_match_intent(message, expected):
+    assert match_intent(message) == expected
+
+
+def test_earlier_intent_wins():
+    assert match_intent("Please review my plan") == "plan"
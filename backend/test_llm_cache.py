@@ -0,0 +1,124 @@
+import asyncio
+import sys
+import types
+
+import pytest
+
+from core.services.llm_cache import SemanticCache
+
+
+def _messages(prompt: str, history=()):
+    return [*history, {"role": "user", "content": prompt}]
+
+
+class FakeEncoder:
+    """Maps each known prompt to a fixed unit vector"""
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+
+    def encode(self, texts, normalize_embeddings=True):
+        import numpy as np
+        return np.array([self.vectors[text] for text in texts], dtype=np.float32)
+
+
+def _semantic_cache(vectors, **kwargs) -> SemanticCache:
+    pytest.importorskip("numpy")
+    cache = SemanticCache(**kwargs)
+    cache._encoder = FakeEncoder(vectors)
+    return cache
+
+
+def test_exact_hit_and_miss():
+    cache = SemanticCache()
+    cache._encoder_unavailable = True
+
+    async def run():
+        assert await cache.lookup(_messages("hello"), "m", 0.0) is None
+        await cache.store(_messages("hello"), "m", 0.0, None, "cached")
+        assert await cache.lookup(_messages("hello"), "m", 0.0) == "cached"
+        assert await cache.lookup(_messages("hello"), "other-model", 0.0) is None
+
+    asyncio.run(run())
+    assert cache.hits == 1
+    assert cache.misses == 2
+
+
+def test_high_temperature_is_not_cached():
+    cache = SemanticCache(max_temperature=0.3)
+    cache._encoder_unavailable = True
+
+    async def run():
+        await cache.store(_messages("hello"), "m", 0.9, None, "cached")
+        return await cache.lookup(_messages("hello"), "m", 0.9)
+
+    assert asyncio.run(run()) is None
+    assert cache.get_stats()["entries"] == 0
+
+
+def test_similarity_threshold():
+    cache = _semantic_cache({
+        "stored": [1.0, 0.0],
+        "close": [0.96, 0.28],
+        "far": [0.6, 0.8],
+    }, similarity_threshold=0.92)
+
+    async def run():
+        await cache.store(_messages("stored"), "m", 0.2, None, "cached")
+        return (
+            await cache.lookup(_messages("close"), "m", 0.2),
+            await cache.lookup(_messages("far"), "m", 0.2),
+        )
+
+    assert asyncio.run(run()) == ("cached", None)
+
+
+def test_scope_eviction_and_row_cap():
+    cache = _semantic_cache({
+        "a": [1.0, 0.0],
+        "b": [0.0, 1.0],
+        "c": [0.6, 0.8],
+    }, max_scopes=2, max_scope_rows=2)
+
+    async def run():
+        # Three history prefixes: the oldest scope is evicted
+        for turn in ("one", "two", "three"):
+            history = [{"role": "user", "content": turn}]
+            await cache.store(_messages("a", history), "m", 0.2, None, turn)
+        assert len(cache._scopes) == 2
+
+        # Three rows in one scope: the oldest row is overwritten
+        for prompt in ("a", "b", "c"):
+            await cache.store(_messages(prompt), "m", 0.2, None, prompt)
+        cache._exact.clear()
+        return (
+            await cache.lookup(_messages("a"), "m", 0.2),
+            await cache.lookup(_messages("c"), "m", 0.2),
+        )
+
+    assert asyncio.run(run()) == (None, "c")
+    scope = next(reversed(cache._scopes.values()))
+    assert scope.count == 2
+
+
+def test_encoder_load_failure_falls_back_to_exact_matching(monkeypatch):
+    class FailingSentenceTransformer:
+        def __init__(self, name):
+            raise OSError("model download failed")
+
+    fake_module = types.ModuleType("sentence_transformers")
+    fake_module.SentenceTransformer = FailingSentenceTransformer
+    monkeypatch.setitem(sys.modules, "sentence_transformers", fake_module)
+
+    cache = SemanticCache()
+
+    async def run():
+        await cache.store(_messages("hello"), "m", 0.2, None, "cached")
+        return (
+            await cache.lookup(_messages("hello"), "m", 0.2),
+            await cache.lookup(_messages("hello there"), "m", 0.2),
+        )
+
+    assert asyncio.run(run()) == ("cached", None)
+    assert cache._encoder_unavailable
+    assert cache.get_stats()["semantic_enabled"] is False
@@ -4,16 +4,28 @@ Tests both mock and real LLM services
 """
 
 import asyncio
+import logging
 import sys
 import os
 
 # Add the backend directory to the path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from core.services.llm import LLMServiceFactory
+from core.services.llm import LLMServiceFactory, MockLLMService
 from core.dependencies import get_llm_service, update_llm_service_config, get_service_stats
 from utils.config import settings
 
+log = logging.getLogger(__name__)
+
+# (prompt type, prompt, system prompt) for each mock-service prompt type
+_TEST_PROMPTS = (
+    ("planning", "Create a research plan for AI ethics", "You are a planning expert."),
+    ("research", "Research the impact of climate change on biodiversity", "You are a research expert."),
+    ("writing", "Write a report about renewable energy adoption", "You are a writing expert."),
+    ("review", "Review this research paper on machine learning", "You are a review expert."),
+    ("general", "Explain quantum computing basics", "You are a general expert.")
+)
+
 async def test_mock_service():
     """Test the mock LLM service"""
     print("🧪 Testing Mock LLM Service...")
@@ -21,35 +33,31 @@ async def test_mock_service():
     # Get mock service
     mock_service = get_llm_service(use_mock=True)
     
-    # Test different prompt types
-    test_prompts = [
-        ("planning", "Create a research plan for AI ethics"),
-        ("research", "Research the impact of climate change on biodiversity"),
-        ("writing", "Write a report about renewable energy adoption"),
-        ("review", "Review this research paper on machine learning"),
-        ("general", "Explain quantum computing basics")
-    ]
-    
-    for prompt_type, prompt in test_prompts:
-        print(f"\n📝 Testing {prompt_type} prompt:")
-        print(f"   Prompt: {prompt[:50]}...")
+    # Issue all prompts at once so the simulated delays overlap
+    responses = await asyncio.gather(*[
+        mock_service.generate_response(
+            prompt=prompt,
+            system_prompt=system_prompt,
+            temperature=0.7,
+            max_tokens=1000
+        )
+        for _, prompt, system_prompt in _TEST_PROMPTS
+    ], return_exceptions=True)
+    
+    # Per-prompt details go through logging so they are only formatted when shown
+    for (prompt_type, prompt, _), response in zip(_TEST_PROMPTS, responses):
+        log.info("\n📝 Testing %s prompt:", prompt_type)
+        log.info("   Prompt: %.50s...", prompt)
         
-        try:
-            response = await mock_service.generate_response(
-                prompt=prompt,
-                system_prompt=f"You are a {prompt_type} expert.",
-                temperature=0.7,
-                max_tokens=1000
-            )
-            
-            print(f"   ✅ Success!")
-            print(f"   📊 Tokens: {response.tokens_used}")
-            print(f"   💰 Cost: ${response.cost:.4f}")
-            print(f"   ⏱️  Time: {response.execution_time:.2f}s")
-            print(f"   📄 Content preview: {response.content[:100]}...")
-            
-        except Exception as e:
-            print(f"   ❌ Error: {str(e)}")
+        if isinstance(response, Exception):
+            log.info("   ❌ Error: %s", response)
+            continue
+        
+        log.info("   ✅ Success!")
+        log.info("   📊 Tokens: %s", response.tokens_used)
+        log.info("   💰 Cost: $%.4f", response.cost)
+        log.info("   ⏱️  Time: %.2fs", response.execution_time)
+        log.info("   📄 Content preview: %.100s...", response.content)
     
     print("\n🎯 Mock service testing completed!")
 
@@ -100,21 +108,29 @@ async def test_toggle_functionality():
     print("\n1. Testing with mock enabled:")
     update_llm_service_config(use_mock=True)
     mock_service = get_llm_service()
+    assert isinstance(mock_service, MockLLMService)
     print(f"   Service type: {type(mock_service).__name__}")
     
     # Test with real
     print("\n2. Testing with real enabled:")
-    try:
+    if not settings.llm_api_key:
+        print("   ⚠️  No API key configured for real LLM. Skipping real service switch.")
+    else:
         update_llm_service_config(use_mock=False)
-        real_service = get_llm_service()
-        print(f"   Service type: {type(real_service).__name__}")
-    except Exception as e:
-        print(f"   Error switching to real service: {str(e)}")
+        try:
+            real_service = get_llm_service()
+        except (ImportError, ValueError) as e:
+            # Provider SDK not installed, or provider not supported
+            print(f"   Error switching to real service: {str(e)}")
+        else:
+            assert not isinstance(real_service, MockLLMService)
+            print(f"   Service type: {type(real_service).__name__}")
     
     # Switch back to mock
     print("\n3. Switching back to mock:")
     update_llm_service_config(use_mock=True)
     mock_service = get_llm_service()
+    assert isinstance(mock_service, MockLLMService)
     print(f"   Service type: {type(mock_service).__name__}")
     
     print("\n🎯 Toggle functionality testing completed!")
@@ -153,11 +169,15 @@ async def main():
     print(f"   LLM Model: {settings.llm_model}")
     print(f"   API Key Configured: {'Yes' if settings.llm_api_key else 'No'}")
     
-    # Run tests
+    # Run tests; only the toggle test changes global config, so the rest
+    # can run concurrently once it is done
     await test_toggle_functionality()
-    await test_mock_service()
-    await test_real_service()
-    await test_service_stats()
+    tests = [test_mock_service(), test_service_stats()]
+    if settings.llm_api_key:
+        tests.append(test_real_service())
+    else:
+        print("⚠️  No API key configured for real LLM. Skipping real service test.")
+    await asyncio.gather(*tests)
     
     print("\n" + "=" * 50)
     print("✅ All tests completed!")
@@ -168,4 +188,14 @@ async def main():
     print("   - Service statistics: ✅ Working")
 
 if __name__ == "__main__":
+    # Same stream and bare format as print; TEST_LOG=WARNING silences the details
+    logging.basicConfig(level=os.getenv("TEST_LOG", "INFO"), format="%(message)s", stream=sys.stdout)
+
+    # Use uvloop's event loop when it is installed
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
+
     asyncio.run(main())
\ No newline at end of file
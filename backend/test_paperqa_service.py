@@ -1,9 +1,105 @@
 import asyncio
 import pytest
 
+from core.services import paperqa_service as paperqa_service_mod
 from core.services.paperqa_service import PaperQAService
 
 
+class FakeCollection:
+    def __init__(self, name: str):
+        self.name = name
+
+
+class FakeManager:
+    def get_collection(self, collection_name: str):
+        return FakeCollection(collection_name) if collection_name == "Known" else None
+
+
+@pytest.fixture
+def patched_service(monkeypatch, tmp_path):
+    """PaperQAService with a fake collections manager and cache files under tmp_path"""
+    monkeypatch.setattr(paperqa_service_mod, "my_settings", object())
+    monkeypatch.setattr(paperqa_service_mod, "collections_manager", FakeManager())
+    monkeypatch.setattr(paperqa_service_mod, "_cache_path", lambda name: tmp_path / name / "paperqa_cache.pkl")
+    monkeypatch.setattr(paperqa_service_mod, "_CACHE_PATHS", {})
+    return PaperQAService(), tmp_path
+
+
+@pytest.mark.parametrize("collection_name, cache_exists, expected_error", [
+    ("Known", True, None),
+    ("Known", False, "Cache file not found"),
+    ("Unknown", False, "not found"),
+])
+def test_resolve_cache_file(patched_service, collection_name, cache_exists, expected_error):
+    service, tmp_path = patched_service
+    if cache_exists:
+        (tmp_path / collection_name).mkdir()
+        (tmp_path / collection_name / "paperqa_cache.pkl").touch()
+
+    cache_file_path, error_msg = service._resolve_cache_file(collection_name)
+
+    if expected_error is None:
+        assert error_msg is None
+        assert cache_file_path == tmp_path / collection_name / "paperqa_cache.pkl"
+    else:
+        assert cache_file_path is None
+        assert expected_error in error_msg
+
+
+class StubText:
+    def __init__(self, text: str, embedding):
+        self.text = text
+        self.embedding = embedding
+
+
+class StubDocs:
+    """Picklable stand-in for paperqa Docs with the attributes the split cache uses"""
+
+    def __init__(self, texts):
+        self.texts = texts
+        self.docs = {}
+
+
+def _write_docs_pickle(tmp_path, embeddings):
+    import pickle
+
+    cache_file_path = tmp_path / "paperqa_cache.pkl"
+    docs = StubDocs([StubText(f"text {index}", embedding) for index, embedding in enumerate(embeddings)])
+    with open(cache_file_path, "wb") as f:
+        pickle.dump(docs, f)
+    return cache_file_path
+
+
+def test_split_cache_memory_maps_embeddings(tmp_path):
+    np = pytest.importorskip("numpy")
+    cache_file_path = _write_docs_pickle(tmp_path, [[0.1, 0.2], [0.3, 0.4]])
+
+    first = paperqa_service_mod._load_docs(cache_file_path)
+    assert first.texts[0].embedding == [0.1, 0.2]
+
+    second = paperqa_service_mod._load_docs(cache_file_path)
+    assert [text_obj.text for text_obj in second.texts] == ["text 0", "text 1"]
+    assert isinstance(second.texts[1].embedding, np.memmap)
+    # float lists keep their float64 precision
+    assert second.texts[1].embedding.dtype == np.float64
+    assert second.texts[1].embedding.tolist() == [0.3, 0.4]
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+@pytest.mark.parametrize("kept_bytes", [0, 8])
+def test_truncated_split_cache_falls_back_to_pickle(tmp_path, kept_bytes):
+    pytest.importorskip("numpy")
+    cache_file_path = _write_docs_pickle(tmp_path, [[0.1, 0.2]])
+    paperqa_service_mod._load_docs(cache_file_path)
+
+    meta_path = paperqa_service_mod._split_cache_paths(cache_file_path)[0]
+    meta_path.write_bytes(meta_path.read_bytes()[:kept_bytes])
+
+    docs = paperqa_service_mod._load_docs(cache_file_path)
+    assert docs.texts[0].embedding == [0.1, 0.2]
+    # Rewritten from the pickle, so the next load uses the split cache again
+    assert paperqa_service_mod._load_split_cache(cache_file_path) is not None
+
 @pytest.mark.asyncio
 async def test_paperqa_service_with_llm_reasoning_agents():
     """Test PaperQAService with LLM_Reasoning_Agents collection"""
@@ -41,6 +137,13 @@ async def test_paperqa_service_with_llm_reasoning_agents():
 
 
 if __name__ == "__main__":
+    # Use uvloop's event loop when it is installed
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
+
     # Run the test
     asyncio.run(test_paperqa_service_with_llm_reasoning_agents())
 
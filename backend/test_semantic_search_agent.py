@@ -1,44 +1,42 @@
+import asyncio
 import json
-from typing import Any
-from urllib.parse import urlparse
+from typing import Iterator
 
+import httpx
 import pytest
 from fastapi.testclient import TestClient
 
 from main import app
+from core.dependencies import clear_service_cache
 from api.v1.endpoints import idea_missions as idea_mod
 
+# Prefer orjson for response decoding when it is installed
+try:
+    import orjson
+    decode_json = orjson.loads
+except ImportError:
+    decode_json = json.loads
 
-@pytest.fixture()
-def client(monkeypatch: pytest.MonkeyPatch) -> TestClient:
-    # Route internal HTTP calls in semantic search to TestClient instead of localhost:8000
-    monkeypatch.setenv("API_INTERNAL_BASE", "http://testserver")
 
-    test_client = TestClient(app)
+@pytest.fixture(scope="module")
+def internal_client() -> Iterator[httpx.AsyncClient]:
+    # Serve the semantic search tool's internal calls in-process instead of via localhost:8000
+    internal_client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://testserver")
+    yield internal_client
+    # App shutdown may already have closed it; aclose() is safe to repeat
+    asyncio.run(internal_client.aclose())
 
-    # Patch urlopen used by idea_missions.direct_search to call into TestClient
-    class _Resp:
-        def __init__(self, data_bytes: bytes):
-            self._data = data_bytes
 
-        def read(self) -> bytes:
-            return self._data
-
-        def __enter__(self) -> "_Resp":
-            return self
-
-        def __exit__(self, exc_type, exc, tb) -> bool:
-            return False
-
-    def _fake_urlopen(url: str) -> Any:  # type: ignore[override]
-        parsed = urlparse(url)
-        path_and_query = parsed.path + (f"?{parsed.query}" if parsed.query else "")
-        resp = test_client.get(path_and_query)
-        return _Resp(resp.content)
-
-    monkeypatch.setattr(idea_mod, "_urlreq", type("_U", (), {"urlopen": _fake_urlopen}))
-
-    return test_client
+@pytest.fixture(scope="module")
+def client(internal_client: httpx.AsyncClient) -> Iterator[TestClient]:
+    # Built once per module; monkeypatch is function-scoped, so use a MonkeyPatch context
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(idea_mod, "_internal_client", internal_client)
+        # Entering the client runs the app's startup and shutdown handlers
+        with TestClient(app) as test_client:
+            yield test_client
+    # Shutdown closed the cached services; later test modules get fresh ones
+    clear_service_cache()
 
 
 def test_semantic_search_on_existing_mission(client: TestClient):
@@ -53,14 +51,18 @@ def test_semantic_search_on_existing_mission(client: TestClient):
         "limit": 10,
     }
     resp = client.post(f"/api/v1/idea-missions/{mission_id}/agents/search/semantic/execute", json=payload)
-    assert resp.status_code == 200, resp.text
-    body = resp.json()
+    body_bytes = resp.content
+    assert resp.status_code == 200, body_bytes[:500]
+    body = decode_json(body_bytes)
     assert body.get("success") is True
     data = body.get("data") or {}
     results = data.get("results")
     assert isinstance(results, list)
     # Optional: the UI expects a markdown summary persisted in chat
-    chat = client.get(f"/api/v1/idea-missions/{mission_id}/chat").json()["data"]
-    assert any(m.get("agentId") == "semantic" for m in chat)
+    chat = decode_json(client.get(
+        f"/api/v1/idea-missions/{mission_id}/chat",
+        params={"agentId": "semantic", "limit": 1}
+    ).content)["data"]
+    assert chat
 
 
@@ -1,208 +1,185 @@
 """
 Simple test script to verify the LLM toggle implementation
-Uses curl commands instead of HTTP client
+Uses one pooled httpx client for all requests
 """
 
-import subprocess
+import argparse
+import asyncio
 import json
 import time
-import os
 
-def run_command(cmd, input_data=None):
-    """Run a command and return the result"""
+import httpx
+
+# Prefer orjson for response decoding when it is installed
+try:
+    import orjson
+    decode_json = orjson.loads
+except ImportError:
+    decode_json = json.loads
+
+BASE_URL = "http://localhost:8000"
+
+async def request_json(client: httpx.AsyncClient, method: str, url: str, **kwargs):
+    """Make a request and return (parsed JSON, None) or (None, error text)"""
     try:
-        if input_data:
-            result = subprocess.run(
-                cmd, 
-                shell=True, 
-                capture_output=True, 
-                text=True,
-                input=input_data
-            )
-        else:
-            result = subprocess.run(
-                cmd, 
-                shell=True, 
-                capture_output=True, 
-                text=True
-            )
-        
-        if result.returncode == 0:
-            return result.stdout.strip()
-        else:
-            return f"Error: {result.stderr.strip()}"
-    except Exception as e:
-        return f"Exception: {str(e)}"
+        response = await client.request(method, url, **kwargs)
+    except httpx.HTTPError as e:
+        return None, f"Exception: {str(e)}"
+    try:
+        return decode_json(response.content), None
+    except ValueError:
+        return None, response.text
 
-def test_toggle_implementation():
+async def test_toggle_implementation():
     """Test the complete toggle implementation"""
-    
-    base_url = "http://localhost:8000"
-    
+
     print("🚀 Testing LLM Toggle Implementation")
     print("=" * 50)
-    
-    # Test 1: Get current configuration
-    print("\n1. Testing configuration endpoint...")
-    config_result = run_command(f"curl -s {base_url}/api/v1/config")
-    if "Error" not in config_result and "Exception" not in config_result:
-        try:
-            config = json.loads(config_result)
+
+    async with httpx.AsyncClient(
+        base_url=BASE_URL,
+        timeout=60,
+        limits=httpx.Limits(max_keepalive_connections=16)
+    ) as client:
+        # Test 1: Get current configuration
+        print("\n1. Testing configuration endpoint...")
+        config, error = await request_json(client, "GET", "/api/v1/config")
+        if error is None:
             print(f"   ✅ Current config: {json.dumps(config, indent=2)}")
-        except:
-            print(f"   ❌ Failed to parse config: {config_result}")
-    else:
-        print(f"   ❌ Failed to get config: {config_result}")
-    
-    # Test 2: Create a chat session
-    print("\n2. Testing chat session creation...")
-    session_id = None
-    create_result = run_command(
-        f"curl -s -X POST {base_url}/api/v1/chat/sessions "
-        f"-H 'Content-Type: application/json' "
-        f"-d '{{\"title\": \"Toggle Test Session\"}}'"
-    )
-    
-    if "Error" not in create_result and "Exception" not in create_result:
-        try:
-            create_data = json.loads(create_result)
+        else:
+            print(f"   ❌ Failed to get config: {error}")
+
+        # Test 2: Create a chat session
+        print("\n2. Testing chat session creation...")
+        session_id = None
+        create_data, error = await request_json(
+            client, "POST", "/api/v1/chat/sessions",
+            json={"title": "Toggle Test Session"}
+        )
+
+        if error is None:
             if create_data.get("success"):
                 session_id = create_data["data"]["session_id"]
                 print(f"   ✅ Session created: {session_id}")
             else:
                 print(f"   ❌ Failed to create session: {create_data}")
-        except:
-            print(f"   ❌ Failed to parse create response: {create_result}")
-    else:
-        print(f"   ❌ Failed to create session: {create_result}")
-    
-    if not session_id:
-        print("   ⚠️  Skipping message tests - no session created")
-        return
-    
-    # Test 3: Send message with mock LLM
-    print("\n3. Testing message with mock LLM...")
-    start_time = time.time()
-    mock_result = run_command(
-        f"curl -s -X POST {base_url}/api/v1/chat/sessions/{session_id}/messages/toggle "
-        f"-H 'Content-Type: application/json' "
-        f"-d '{{\"message\": \"Explain quantum computing in simple terms\", \"use_real_llm\": false}}'"
-    )
-    
-    if "Error" not in mock_result and "Exception" not in mock_result:
-        try:
-            mock_data = json.loads(mock_result)
-            end_time = time.time()
+        else:
+            print(f"   ❌ Failed to create session: {error}")
+
+        if not session_id:
+            print("   ⚠️  Skipping message tests - no session created")
+            return
+
+        # Tests 3-5 don't depend on each other (messages only append to the
+        # session), so they are sent together. The config update clears the
+        # cached services, so it and the remaining steps run after them, in order
+        async def timed(coro):
+            start_time = time.perf_counter()
+            data, error = await coro
+            return data, error, time.perf_counter() - start_time
+
+        messages_url = f"/api/v1/chat/sessions/{session_id}/messages/toggle"
+        (
+            (mock_data, mock_error, mock_elapsed),
+            (real_data, real_error, real_elapsed),
+            (stats, stats_error)
+        ) = await asyncio.gather(
+            timed(request_json(
+                client, "POST", messages_url,
+                json={"message": "Explain quantum computing in simple terms", "use_real_llm": False}
+            )),
+            timed(request_json(
+                client, "POST", messages_url,
+                json={"message": "What are the benefits of renewable energy?", "use_real_llm": True}
+            )),
+            request_json(client, "GET", "/api/v1/stats")
+        )
+
+        # Test 3: Send message with mock LLM
+        print("\n3. Testing message with mock LLM...")
+        if mock_error is None:
             if mock_data.get("success"):
-                print(f"   ✅ Mock response received in {end_time - start_time:.2f}s")
+                print(f"   ✅ Mock response received in {mock_elapsed:.2f}s")
                 llm_service = mock_data["data"].get("llm_service", {})
                 print(f"   📊 LLM Service: {llm_service}")
                 response_content = mock_data["data"].get("response", "")
                 print(f"   📄 Response preview: {response_content[:100]}...")
             else:
                 print(f"   ❌ Mock request failed: {mock_data}")
-        except:
-            print(f"   ❌ Failed to parse mock response: {mock_result}")
-    else:
-        print(f"   ❌ Failed to send mock message: {mock_result}")
-    
-    # Test 4: Try to send message with real LLM
-    print("\n4. Testing message with real LLM...")
-    start_time = time.time()
-    real_result = run_command(
-        f"curl -s -X POST {base_url}/api/v1/chat/sessions/{session_id}/messages/toggle "
-        f"-H 'Content-Type: application/json' "
-        f"-d '{{\"message\": \"What are the benefits of renewable energy?\", \"use_real_llm\": true}}'"
-    )
-    
-    if "Error" not in real_result and "Exception" not in real_result:
-        try:
-            real_data = json.loads(real_result)
-            end_time = time.time()
+        else:
+            print(f"   ❌ Failed to send mock message: {mock_error}")
+
+        # Test 4: Try to send message with real LLM
+        print("\n4. Testing message with real LLM...")
+        if real_error is None:
             if real_data.get("success"):
-                print(f"   ✅ Real response received in {end_time - start_time:.2f}s")
+                print(f"   ✅ Real response received in {real_elapsed:.2f}s")
                 llm_service = real_data["data"].get("llm_service", {})
                 print(f"   📊 LLM Service: {llm_service}")
                 response_content = real_data["data"].get("response", "")
                 print(f"   📄 Response preview: {response_content[:100]}...")
             else:
                 print(f"   ⚠️  Real LLM failed (expected without API key): {real_data}")
-        except:
-            print(f"   ⚠️  Failed to parse real response (expected): {real_result[:200]}...")
-    else:
-        print(f"   ⚠️  Real LLM failed (expected without API key): {real_result}")
-    
-    # Test 5: Get service statistics
-    print("\n5. Testing service statistics...")
-    stats_result = run_command(f"curl -s {base_url}/api/v1/stats")
-    if "Error" not in stats_result and "Exception" not in stats_result:
-        try:
-            stats = json.loads(stats_result)
+        else:
+            print(f"   ⚠️  Real LLM failed (expected without API key): {real_error[:200]}...")
+
+        # Test 5: Get service statistics
+        print("\n5. Testing service statistics...")
+        if stats_error is None:
             print(f"   ✅ Stats retrieved")
             llm_stats = stats.get("llm_service", {}).get("mock_service", {})
             print(f"   📊 LLM Service calls: {llm_stats.get('total_calls', 0)}")
-        except:
-            print(f"   ❌ Failed to parse stats: {stats_result}")
-    else:
-        print(f"   ❌ Failed to get stats: {stats_result}")
-    
-    # Test 6: Update configuration
-    print("\n6. Testing configuration update...")
-    update_result = run_command(
-        f"curl -s -X POST {base_url}/api/v1/config "
-        f"-H 'Content-Type: application/json' "
-        f"-d '{{\"use_mock_llm\": true, \"llm_temperature\": 0.8, \"llm_max_tokens\": 1500}}'"
-    )
-    
-    if "Error" not in update_result and "Exception" not in update_result:
-        try:
-            update_data = json.loads(update_result)
-            if "message" in update_data:
-                print(f"   ✅ Configuration updated")
-                print(f"   📝 New config: {json.dumps(update_data.get('config', {}), indent=2)}")
-            else:
-                print(f"   ❌ Failed to update config: {update_data}")
-        except:
-            print(f"   ❌ Failed to parse update response: {update_result}")
-    else:
-        print(f"   ❌ Failed to update config: {update_result}")
-    
-    # Test 7: Get chat history
-    print("\n7. Testing chat history...")
-    history_result = run_command(f"curl -s {base_url}/api/v1/chat/sessions/{session_id}/messages")
-    if "Error" not in history_result and "Exception" not in history_result:
-        try:
-            history_data = json.loads(history_result)
+        else:
+            print(f"   ❌ Failed to get stats: {stats_error}")
+
+        # Test 6: Get chat history
+        print("\n6. Testing chat history...")
+        history_data, history_error = await request_json(
+            client, "GET", f"/api/v1/chat/sessions/{session_id}/messages",
+            params={"limit": 3}
+        )
+        if history_error is None:
             if history_data.get("success"):
+                # Only the first 3 messages are fetched; total_count covers the rest
                 messages = history_data["data"]["messages"]
+                total_count = history_data["data"].get("total_count", len(messages))
                 print(f"   ✅ Chat history retrieved")
-                print(f"   💬 Messages: {len(messages)}")
-                for i, msg in enumerate(messages[:3]):  # Show first 3 messages
+                print(f"   💬 Messages: {total_count}")
+                for i, msg in enumerate(messages):
                     print(f"      {i+1}. [{msg['role']}] {msg['content'][:50]}...")
-                if len(messages) > 3:
-                    print(f"      ... and {len(messages) - 3} more messages")
+                if total_count > len(messages):
+                    print(f"      ... and {total_count - len(messages)} more messages")
             else:
                 print(f"   ❌ Failed to get history: {history_data}")
-        except:
-            print(f"   ❌ Failed to parse history: {history_result}")
-    else:
-        print(f"   ❌ Failed to get history: {history_result}")
-    
-    # Test 8: Delete session
-    print("\n8. Testing session deletion...")
-    delete_result = run_command(f"curl -s -X DELETE {base_url}/api/v1/chat/sessions/{session_id}")
-    if "Error" not in delete_result and "Exception" not in delete_result:
-        try:
-            delete_data = json.loads(delete_result)
+        else:
+            print(f"   ❌ Failed to get history: {history_error}")
+
+        # Test 7: Update configuration
+        print("\n7. Testing configuration update...")
+        update_data, update_error = await request_json(
+            client, "POST", "/api/v1/config",
+            json={"use_mock_llm": True, "llm_temperature": 0.8, "llm_max_tokens": 1500}
+        )
+        if update_error is None:
+            if "message" in update_data:
+                print(f"   ✅ Configuration updated")
+                print(f"   📝 New config: {json.dumps(update_data.get('config', {}), indent=2)}")
+            else:
+                print(f"   ❌ Failed to update config: {update_data}")
+        else:
+            print(f"   ❌ Failed to update config: {update_error}")
+
+        # Test 8: Delete session
+        print("\n8. Testing session deletion...")
+        delete_data, error = await request_json(client, "DELETE", f"/api/v1/chat/sessions/{session_id}")
+        if error is None:
             if delete_data.get("success"):
                 print(f"   ✅ Session deleted")
             else:
                 print(f"   ❌ Failed to delete session: {delete_data}")
-        except:
-            print(f"   ❌ Failed to parse delete response: {delete_result}")
-    else:
-        print(f"   ❌ Failed to delete session: {delete_result}")
-    
+        else:
+            print(f"   ❌ Failed to delete session: {error}")
+
     print("\n" + "=" * 50)
     print("✅ Toggle Implementation Test Complete!")
     print("\n📋 Summary:")
@@ -214,8 +191,14 @@ def test_toggle_implementation():
     print("   - Chat operations: ✅ Working")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-i", "--interactive", action="store_true",
+                        help="wait for Enter before starting (e.g. while the server boots)")
+    args = parser.parse_args()
+    
     print("🌐 Make sure the backend server is running on http://localhost:8000")
     print("   Run: cd backend && python main.py")
-    input("\nPress Enter when ready to test...")
-    
-    test_toggle_implementation()
\ No newline at end of file
+    if args.interactive:
+        input("\nPress Enter when ready to test...")
+
+    asyncio.run(test_toggle_implementation())
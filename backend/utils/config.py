@@ -3,7 +3,8 @@ Configuration management for AI Research Assistant Backend
 """
 
 import os
-from typing import Optional
+from functools import lru_cache
+from typing import FrozenSet, Optional, Tuple
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
@@ -19,11 +20,11 @@ class Settings(BaseSettings):
     debug: bool = True
     
     # CORS settings
-    cors_origins: list = [
+    cors_origins: Tuple[str, ...] = (
         "http://localhost:3000",
         "http://localhost:3001",
         "http://127.0.0.1:3000",
-    ]
+    )
     
     # LLM settings
     use_mock_llm: bool = True
@@ -37,11 +38,13 @@ class Settings(BaseSettings):
     llm_max_tokens: int = 2000
     llm_timeout: float = 30.0  # seconds
     llm_max_retries: int = 3
+    llm_max_concurrency: int = 16  # in-flight provider calls per service
+    capture_raw_response: bool = False  # add str(provider response) to response metadata
     
     # File upload settings
     upload_dir: str = "uploads"
     max_file_size: int = 10 * 1024 * 1024  # 10MB
-    allowed_extensions: set = {".pdf", ".doc", ".docx", ".txt"}
+    allowed_extensions: FrozenSet[str] = frozenset({".pdf", ".doc", ".docx", ".txt"})
     
     # Database settings (for future use)
     database_url: str = "sqlite:///./research_assistant.db"
@@ -58,8 +61,16 @@ class Settings(BaseSettings):
         extra="allow",  # allow unrelated env vars like NEXTAUTH_*
     )
 
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """The process-wide Settings instance (.env is read and validated once)"""
+    return Settings()
+
 # Global settings instance
-settings = Settings()
+settings = get_settings()
 
-# Create upload directory if it doesn't exist
-os.makedirs(settings.upload_dir, exist_ok=True)
\ No newline at end of file
+@lru_cache(maxsize=1)
+def ensure_upload_dir() -> str:
+    """Create the upload directory on first use (not at import) and return its path"""
+    os.makedirs(settings.upload_dir, exist_ok=True)
+    return settings.upload_dir
@@ -2,9 +2,11 @@
 Utility functions for the AI Research Assistant Backend
 """
 
-import uuid
 import time
+import secrets
 import asyncio
+import contextvars
+import functools
 import random
 from typing import Any, Dict, List, Optional, Union
 from datetime import datetime
@@ -12,9 +14,16 @@ import json
 
 def generate_id(prefix: str = "") -> str:
     """Generate a unique ID with optional prefix"""
-    unique_id = str(uuid.uuid4())[:8]
+    # Random per id, so ids handed out by the API can't be enumerated
+    unique_id = secrets.token_hex(4)
     return f"{prefix}_{unique_id}" if prefix else unique_id
 
+async def run_in_thread(func, *args, **kwargs):
+    """Run a blocking call in the default executor (asyncio.to_thread, which needs Python 3.9+)"""
+    loop = asyncio.get_running_loop()
+    call = functools.partial(contextvars.copy_context().run, func, *args, **kwargs)
+    return await loop.run_in_executor(None, call)
+
 def get_timestamp() -> str:
     """Get current ISO timestamp"""
     return datetime.now().isoformat()